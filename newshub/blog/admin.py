@@ -151,3 +151,69 @@ class ImageAdmin(admin.ModelAdmin):
         'title',
         'created',
     ]
+
+
+# Customize the SiteStats model admin interface.
+@admin.register(SiteStats)
+class SiteStatsAdmin(admin.ModelAdmin):
+    # Fields to be displayed in the list view of site stats in the admin panel.
+    list_display = [
+        'total_posts',
+        'total_comments',
+        'last_post_publish',
+        'updated',
+    ]
+
+    # The row is maintained automatically, so it is read-only here.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# Customize the AuthorStats model admin interface.
+@admin.register(AuthorStats)
+class AuthorStatsAdmin(admin.ModelAdmin):
+    # Fields to be displayed in the list view of author stats in the admin panel.
+    list_display = [
+        'user',
+        'published_posts',
+        'draft_posts',
+        'rejected_posts',
+        'comments_received',
+        'last_publish',
+    ]
+
+    # Leaderboard order; both columns are indexed.
+    ordering = [
+        '-published_posts',
+        '-comments_received',
+    ]
+
+    # Add a search bar with these fields as searchable.
+    search_fields = [
+        'user__username',
+    ]
+
+    # The rows are maintained automatically, so they are read-only here.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# Customize the CensoredWord model admin interface.
+@admin.register(CensoredWord)
+class CensoredWordAdmin(admin.ModelAdmin):
+    # Fields to be displayed in the list view of censored words in the admin panel.
+    list_display = [
+        'word',
+        'created',
+    ]
+
+    # Add a search bar with these fields as searchable.
+    search_fields = [
+        'word',
+    ]
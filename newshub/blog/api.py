@@ -0,0 +1,197 @@
+import hashlib
+import json
+from datetime import date, datetime
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+from .models import Comment, Image, ImageRendition, Post, as_gregorian
+from .pagination import KeysetPaginator
+
+# Posts per page by default, and the most a client may ask for with ?limit=.
+PAGE_SIZE = getattr(settings, 'BLOG_API_PAGE_SIZE', 20)
+MAX_PAGE_SIZE = getattr(settings, 'BLOG_API_MAX_PAGE_SIZE', 100)
+
+# Seconds clients and proxies may reuse a response without revalidating it.
+MAX_AGE = getattr(settings, 'BLOG_API_MAX_AGE', 60)
+
+# Public name of every post field -> the column it is read from.
+POST_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'slug': 'slug',
+    'author': 'author__username',
+    'publish': 'publish',
+    'update': 'update',
+    'reading_time': 'reading_time',
+    'description': 'description',
+    'description_html': 'description_html',
+    'comment_count': 'active_comment_count',
+    'views': 'views',
+    'cover_image': 'cover_image__image_file',
+}
+
+# Fields returned when the request has no ?fields=.
+DEFAULT_POST_FIELDS = ['id', 'title', 'author', 'publish', 'reading_time', 'comment_count', 'cover_image']
+
+# Columns holding file names, returned as URLs.
+FILE_COLUMNS = {'cover_image__image_file', 'image_file', 'file'}
+
+COMMENT_FIELDS = {'id': 'id', 'name': 'name', 'body': 'body', 'created': 'created'}
+IMAGE_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'description': 'description',
+    'url': 'image_file',
+    'created': 'created',
+}
+
+
+class ApiError(Exception):
+    """
+    Client error, returned as {"error": message} with the given status.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _value(column, value):
+    # JSON representation of one column value.
+    if value is None:
+        return None
+    if column in FILE_COLUMNS:
+        return default_storage.url(value) if value else None
+    if isinstance(value, (datetime, date)) or hasattr(value, 'togregorian'):
+        return as_gregorian(value).isoformat()
+    return value
+
+
+def _row(row, fields):
+    # {public name: value} of a values() row; `fields` maps names to columns.
+    return {name: _value(column, row[column]) for name, column in fields.items()}
+
+
+def _json_response(request, data):
+    """
+    Compact JSON response with a strong ETag of its body, answering
+    If-None-Match with 304.
+    """
+    body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=MAX_AGE)
+    return response
+
+
+def _requested_fields(request):
+    """
+    {public name: column} of the post fields asked for with ?fields=a,b
+    (the defaults without it).
+    """
+    raw = request.GET.get('fields')
+    names = [name.strip() for name in raw.split(',') if name.strip()] if raw else DEFAULT_POST_FIELDS
+    unknown = [name for name in names if name not in POST_FIELDS]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(POST_FIELDS)}.")
+    return {name: POST_FIELDS[name] for name in names}
+
+
+def _post_values(queryset, fields):
+    """
+    values() of the requested columns, plus id and publish for the cursors.
+    """
+    return queryset.values(*{*fields.values(), 'id', 'publish'})
+
+
+def _api_view(view):
+    # Read-only endpoints: GET/HEAD only, errors as JSON.
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'error': str(error)}, status=error.status)
+    return wrapper
+
+
+@_api_view
+def post_list(request):
+    """
+    Published posts, newest first, paginated with ?cursor= (see the `next`
+    and `previous` values). ?fields= selects the fields, ?limit= the page size.
+    """
+    fields = _requested_fields(request)
+    try:
+        limit = min(max(int(request.GET.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ApiError('limit must be an integer.')
+
+    queryset = _post_values(Post.published.all(), fields)
+    # page(), not get_page(): a client following a stale cursor gets the end
+    # of the list rather than the first page again.
+    page = KeysetPaginator(queryset, limit).page(request.GET.get('cursor'))
+    if not page.object_list:
+        return _json_response(request, {'results': [], 'next': None, 'previous': None})
+    return _json_response(request, {
+        'results': [_row(row, fields) for row in page.object_list],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@_api_view
+def post_detail(request, id):
+    """
+    One published post with its active comments (oldest first).
+    """
+    fields = _requested_fields(request)
+    row = _post_values(Post.published.filter(id=id), fields).first()
+    if row is None:
+        raise ApiError('Post not found.', status=404)
+    data = _row(row, fields)
+    data['comments'] = [
+        _row(comment, COMMENT_FIELDS)
+        for comment in Comment.objects.filter(
+            post_id=id,
+            active=True,
+        ).order_by('created').values(*COMMENT_FIELDS.values())
+    ]
+    return _json_response(request, data)
+
+
+@_api_view
+def post_images(request, id):
+    """
+    Images of a published post, with the URLs of their renditions.
+    """
+    if not Post.published.filter(id=id).exists():
+        raise ApiError('Post not found.', status=404)
+
+    renditions = {}
+    for image_id, kind, fmt, width, height, name in ImageRendition.objects.filter(
+        image__post_id=id,
+    ).order_by('width').values_list('image_id', 'kind', 'format', 'width', 'height', 'file'):
+        renditions.setdefault(image_id, []).append({
+            'kind': kind,
+            'format': fmt,
+            'width': width,
+            'height': height,
+            'url': _value('file', name),
+        })
+
+    images = []
+    for row in Image.objects.filter(post_id=id).values(*IMAGE_FIELDS.values()):
+        image = _row(row, IMAGE_FIELDS)
+        image['renditions'] = renditions.get(row['id'], [])
+        images.append(image)
+    return _json_response(request, {'results': images})
@@ -11,3 +11,10 @@ class BlogConfig(AppConfig):
 
     # A human-readable name for the application that appears in the Django admin panel.
     verbose_name = "وبلاگ"
+
+    def ready(self):
+        # Connect the signal receivers that keep denormalized data up to date.
+        from . import signals  # noqa: F401
+        # Time queries on every connection, management commands and
+        # background threads included, for the slow-query log.
+        from . import instrumentation  # noqa: F401
@@ -0,0 +1,154 @@
+"""
+Async versions of the public read views, for ASGI servers.
+
+They use the async ORM and load everything the templates need before
+rendering (tag data through context['preloaded_tags']), so a request only
+holds the event loop while it waits on the database or the client. Templates
+rendered here must not query the database: a tag or attribute that does
+raises SynchronousOnlyOperation.
+"""
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404
+from django.shortcuts import render
+from django.utils.cache import get_conditional_response
+from django.utils.http import urlencode
+
+from .conditional import apost_detail_validators, apost_list_validators
+from .counters import view_counter
+from .forms import CommentForm, SearchForm
+from .models import Post, SiteStats
+from .pagination import KeysetPaginator
+from .search import MAX_RESULTS, search_queryset
+from .templatetags.blog_tags import apreload_tags
+from .views import PostListView, SEARCH_RESULTS_PER_PAGE
+
+# Cached tags called by blog/index.html, as (tag name, positional args);
+# must match the template's calls exactly.
+INDEX_TAGS = [
+    ('latest_posts', (3,)),
+    ('most_active_users', ()),
+    ('most_popular_posts', (3,)),
+    ('trending_posts', (3,)),
+]
+
+
+def _not_modified(request, etag):
+    # 304 (or 412) answer to a conditional request, as condition() gives.
+    if etag is None:
+        return None
+    return get_conditional_response(request, etag=etag)
+
+
+def _set_etag(request, response, etag):
+    if etag is None or request.method not in ('GET', 'HEAD'):
+        return
+    response.headers.setdefault('ETag', etag)
+
+
+async def index(request):
+    context = {
+        'site_stats': await SiteStats.aload_cached(),
+        'preloaded_tags': await apreload_tags(INDEX_TAGS),
+    }
+
+    return render(
+        request,
+        "blog/index.html",
+        context,
+    )
+
+
+async def _offset_page(request, queryset, page_size):
+    # Same pages and 404s as ListView.paginate_queryset().
+    paginator = Paginator(queryset, page_size)
+    # Primed here, so the paginator never counts synchronously.
+    paginator.count = await queryset.acount()
+    number = request.GET.get('page') or 1
+    try:
+        page = paginator.page(paginator.num_pages if number == 'last' else int(number))
+    except (ValueError, InvalidPage):
+        raise Http404('Invalid page.')
+    page.object_list = [post async for post in page.object_list]
+    return paginator, page
+
+
+async def post_list(request):
+    """
+    Async version of PostListView, with the same pagination modes.
+    """
+    etag = await apost_list_validators(request)
+    response = _not_modified(request, etag)
+    if response is None:
+        queryset = PostListView.queryset.all()
+        if PostListView.pagination_mode == 'keyset':
+            paginator = KeysetPaginator(queryset, PostListView.paginate_by)
+            page = await paginator.aget_page(request.GET.get('cursor'))
+        else:
+            paginator, page = await _offset_page(request, queryset, PostListView.paginate_by)
+
+        context = {
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            'object_list': page.object_list,
+            'posts': page.object_list,
+        }
+        response = render(request, PostListView.template_name, context)
+    _set_etag(request, response, etag)
+    return response
+
+
+async def post_detail(request, id):
+    """
+    Async version of views.post_detail, counting views the same way.
+    """
+    etag = await apost_detail_validators(request, id)
+    response = _not_modified(request, etag)
+    if response is None:
+        try:
+            post = await Post.published.with_images().select_related('author').aget(id=id)
+        except Post.DoesNotExist:
+            raise Http404('No Post matches the given query.')
+
+        context = {
+            'post': post,
+            'form': CommentForm(),
+            'comments': [comment async for comment in post.comments.filter(active=True)],
+        }
+        response = render(request, "blog/detail.html", context)
+    _set_etag(request, response, etag)
+
+    if response.status_code in (200, 304):
+        await view_counter.ahit(id)
+    return response
+
+
+async def post_search(request):
+    """
+    Async version of views.post_search.
+    """
+    query = None
+    results = []
+    page_obj = None
+
+    if 'query' in request.GET:
+        form = SearchForm(data=request.GET)
+
+        if form.is_valid():
+            query = form.cleaned_data['query']
+            results = [post async for post in search_queryset(query)[:MAX_RESULTS]]
+            page_obj = Paginator(results, SEARCH_RESULTS_PER_PAGE).get_page(request.GET.get('page'))
+            results = page_obj.object_list
+
+    context = {
+        'query': query,
+        'results': results,
+        'page_obj': page_obj,
+        'pagination_query': urlencode({'query': query}) if query else '',
+    }
+
+    return render(
+        request,
+        'blog/search.html',
+        context,
+    )
@@ -0,0 +1,187 @@
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .routers import FILL_FROM_PRIMARY_SECONDS, REPLICAS, reading_from_primary
+
+# Cache (an alias of settings.CACHES) holding generations and cached fragments.
+# Use a shared backend (file, memcached, redis...) when running several processes.
+CACHE_ALIAS = getattr(settings, 'BLOG_CACHE_ALIAS', 'default')
+
+# Seconds a cached value is served as fresh.
+FRESH_TIMEOUT = getattr(settings, 'BLOG_CACHE_TIMEOUT', 300)
+
+# Extra seconds an expired or outdated value is kept to be served while
+# another worker recomputes it.
+STALE_TIMEOUT = getattr(settings, 'BLOG_CACHE_STALE_TIMEOUT', 3600)
+
+# Longest time a worker may hold a recompute lock.
+LOCK_TIMEOUT = getattr(settings, 'BLOG_CACHE_LOCK_TIMEOUT', 30)
+
+# Prefix of every key written by this module.
+PREFIX = 'blog'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _generation_key(scope):
+    return f'{PREFIX}:generation:{scope}'
+
+
+def generations(scopes):
+    """
+    Current generation of every scope ('post', 'comment', 'image'...), as a tuple.
+    """
+    cache = get_cache()
+    keys = [_generation_key(scope) for scope in scopes]
+    values = cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    for key in missing:
+        # Counters never expire; add() keeps a concurrent bump intact.
+        cache.add(key, 1, None)
+    if missing:
+        values.update(cache.get_many(missing))
+    return tuple(values.get(key, 1) for key in keys)
+
+
+async def agenerations(scopes):
+    """
+    Async version of generations().
+    """
+    cache = get_cache()
+    keys = [_generation_key(scope) for scope in scopes]
+    values = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in values]
+    for key in missing:
+        await cache.aadd(key, 1, None)
+    if missing:
+        values.update(await cache.aget_many(missing))
+    return tuple(values.get(key, 1) for key in keys)
+
+
+def _bumped_key(scope):
+    return f'{PREFIX}:bumped:{scope}'
+
+
+def bump(*scopes):
+    """
+    Start a new generation of the given scopes, outdating everything cached from them.
+    """
+    cache = get_cache()
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 2, None)
+    if REPLICAS:
+        # Replicas may not have replayed the write yet (see recently_bumped()).
+        cache.set_many({_bumped_key(scope): True for scope in scopes}, FILL_FROM_PRIMARY_SECONDS)
+
+
+def recently_bumped(scopes):
+    """
+    Whether one of the scopes was bumped so recently that a replica may still
+    return the rows from before. Values cached from such reads would be stored
+    under the new generation, so they are read from the primary instead.
+    """
+    if not REPLICAS:
+        return False
+    return bool(get_cache().get_many([_bumped_key(scope) for scope in scopes]))
+
+
+async def arecently_bumped(scopes):
+    """
+    Async version of recently_bumped().
+    """
+    if not REPLICAS:
+        return False
+    return bool(await get_cache().aget_many([_bumped_key(scope) for scope in scopes]))
+
+
+def cached_call(name, depends, func, *args, timeout=None, **kwargs):
+    """
+    Return func(*args, **kwargs), cached under `name` and its arguments.
+
+    Each entry records the generations of the `depends` scopes it was computed
+    from, so any write to those models outdates it. An outdated or expired entry
+    is recomputed by a single worker (the one winning the lock) while the others
+    keep serving the old value; without any value to serve, callers compute
+    directly.
+    """
+    cache = get_cache()
+    timeout = FRESH_TIMEOUT if timeout is None else timeout
+    key = f'{PREFIX}:call:{name}:{args!r}:{sorted(kwargs.items())!r}'
+    version = generations(depends)
+    now = time.time()
+
+    entry = cache.get(key)
+    if entry is not None:
+        entry_version, fresh_until, value = entry
+        if entry_version == version and fresh_until > now:
+            return value
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            with reading_from_primary(recently_bumped(depends)):
+                value = func(*args, **kwargs)
+            cache.set(key, (version, now + timeout, value), timeout + STALE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    if entry is not None:
+        # Someone else is recomputing: serve the stale value meanwhile.
+        return entry[2]
+    return func(*args, **kwargs)
+
+
+async def acached_call(name, depends, func, *args, timeout=None, **kwargs):
+    """
+    Async version of cached_call() for a coroutine function `func`. Entries
+    are shared with cached_call() for the same name and arguments.
+    """
+    cache = get_cache()
+    timeout = FRESH_TIMEOUT if timeout is None else timeout
+    key = f'{PREFIX}:call:{name}:{args!r}:{sorted(kwargs.items())!r}'
+    version = await agenerations(depends)
+    now = time.time()
+
+    entry = await cache.aget(key)
+    if entry is not None:
+        entry_version, fresh_until, value = entry
+        if entry_version == version and fresh_until > now:
+            return value
+
+    lock_key = f'{key}:lock'
+    if await cache.aadd(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            with reading_from_primary(await arecently_bumped(depends)):
+                value = await func(*args, **kwargs)
+            await cache.aset(key, (version, now + timeout, value), timeout + STALE_TIMEOUT)
+        finally:
+            await cache.adelete(lock_key)
+        return value
+
+    if entry is not None:
+        return entry[2]
+    return await func(*args, **kwargs)
+
+
+def cached(name, depends, timeout=None):
+    """
+    Decorator form of cached_call.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return cached_call(name, depends, func, *args, timeout=timeout, **kwargs)
+        # Lets an async twin share the entries through acached_call().
+        wrapper.cache_args = (name, depends, timeout)
+        return wrapper
+    return decorator
@@ -0,0 +1,173 @@
+import time
+from threading import Lock
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import CensoredWord
+
+# Text put in place of every censored word.
+REPLACEMENT = getattr(settings, 'BLOG_CENSOR_REPLACEMENT', "'سانسور'")
+
+# Words censored in addition to the CensoredWord table.
+DEFAULT_WORDS = getattr(settings, 'BLOG_CENSORED_WORDS', [])
+
+# How often, in seconds, a process checks the table for changes.
+CHECK_INTERVAL = getattr(settings, 'BLOG_CENSOR_CHECK_INTERVAL', 30)
+
+# Arabic code points folded onto their Persian equivalents before matching.
+CHARACTER_MAP = {
+    'ي': 'ی',
+    'ى': 'ی',
+    'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه',
+    'ۀ': 'ه',
+    'أ': 'ا',
+    'إ': 'ا',
+    'آ': 'ا',
+    'ٱ': 'ا',
+    'ؤ': 'و',
+}
+
+# Characters ignored while matching: tatweel, harakat, superscript alef,
+# zero-width non-joiner and joiner.
+IGNORED = {chr(c) for c in range(0x064B, 0x0660)} | {'ـ', 'ٰ', '‌', '‍'}
+
+
+def normalize(text):
+    """
+    Normalize text for matching and return it with, for every character
+    of the result, the index of the character it comes from in `text`.
+    """
+    chars = []
+    positions = []
+    for index, char in enumerate(text):
+        if char in IGNORED:
+            continue
+        # Lowercasing may lengthen a character ('İ' -> 'i̇'): one position per output character.
+        for folded in CHARACTER_MAP.get(char, char).lower():
+            chars.append(folded)
+            positions.append(index)
+    return ''.join(chars), positions
+
+
+class CensorMatcher:
+    """
+    Aho–Corasick automaton over the normalized banned words.
+    Scanning a text costs O(len(text) + matches), whatever the number of words.
+    """
+
+    def __init__(self, words):
+        # Trie transitions, failure links and, per state, the length of the
+        # longest word ending there (0 if none).
+        self.goto = [{}]
+        self.fail = [0]
+        self.longest = [0]
+
+        for word in words:
+            word, _ = normalize(word.strip())
+            if not word:
+                continue
+            state = 0
+            for char in word:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.longest.append(0)
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.longest[state] = max(self.longest[state], len(word))
+
+        # Breadth-first pass computing failure links.
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, target in self.goto[state].items():
+                queue.append(target)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                link = self.goto[fallback].get(char, 0)
+                self.fail[target] = link if link != target else 0
+                self.longest[target] = max(self.longest[target], self.longest[self.fail[target]])
+
+    def spans(self, text):
+        """
+        Merged (start, end) ranges of `text` covered by banned words.
+        """
+        normalized, positions = normalize(text)
+        found = []
+        state = 0
+        for index, char in enumerate(normalized):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            length = self.longest[state]
+            if length:
+                found.append((index + 1 - length, index + 1))
+
+        found.sort()
+        merged = []
+        for start, end in found:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return [(positions[start], positions[end - 1] + 1) for start, end in merged]
+
+    def censor(self, text):
+        """
+        Return `text` with every banned word replaced by REPLACEMENT.
+        """
+        if len(self.goto) == 1 or not text:
+            return text
+        parts = []
+        last = 0
+        for start, end in self.spans(text):
+            parts.append(text[last:start])
+            parts.append(REPLACEMENT)
+            last = end
+        parts.append(text[last:])
+        return ''.join(parts)
+
+
+_lock = Lock()
+_matcher = None
+_fingerprint = None
+_checked_at = 0.0
+
+
+def _table_fingerprint():
+    # Changes whenever a word is added, edited or removed.
+    state = CensoredWord.objects.aggregate(count=Count('id'), updated=Max('updated'))
+    return state['count'], state['updated']
+
+
+def get_matcher():
+    """
+    Return this process's compiled matcher, rebuilding it only when the
+    CensoredWord table changed (checked at most every CHECK_INTERVAL seconds).
+    """
+    global _matcher, _fingerprint, _checked_at
+    now = time.monotonic()
+    if _matcher is not None and now - _checked_at < CHECK_INTERVAL:
+        return _matcher
+
+    with _lock:
+        if _matcher is not None and now - _checked_at < CHECK_INTERVAL:
+            return _matcher
+        fingerprint = _table_fingerprint()
+        if _matcher is None or fingerprint != _fingerprint:
+            words = [*DEFAULT_WORDS, *CensoredWord.objects.values_list('word', flat=True)]
+            _matcher = CensorMatcher(words)
+            _fingerprint = fingerprint
+        _checked_at = now
+    return _matcher
+
+
+def invalidate():
+    """
+    Force this process to re-check the word list on its next use.
+    """
+    global _checked_at
+    _checked_at = 0.0
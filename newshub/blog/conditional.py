@@ -0,0 +1,130 @@
+import hashlib
+
+from django.db.models import Count, Max, Q
+
+from .cache import agenerations, arecently_bumped, generations, recently_bumped
+from .models import Post, as_gregorian
+from .routers import reading_from_primary
+
+# Cache scopes (see blog.cache) the validators are computed from. Right
+# after a write to them the validators are read from the primary, like the
+# pages cached with them.
+DETAIL_SCOPES = ('post', 'comment', 'image')
+LIST_SCOPES = ('post', 'image')
+
+# Image changes (deletions, renditions finished in the background) don't
+# touch Post.update: the ETags include the image generation instead.
+IMAGE_SCOPES = ('image',)
+
+
+def _etag(*parts):
+    # Weak validator: pages embed per-visitor bits (CSRF tokens) around the same data.
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _latest(*values):
+    values = [as_gregorian(value) for value in values if value is not None]
+    return max(values) if values else None
+
+
+def _memoize(func):
+    # The validators come from one query, run once per request.
+    attribute = f'_{func.__name__}'
+
+    def wrapper(request, *args, **kwargs):
+        if not hasattr(request, attribute):
+            setattr(request, attribute, func(request, *args, **kwargs))
+        return getattr(request, attribute)
+    return wrapper
+
+
+def _detail_row(id):
+    # Validator columns of one published post, as a values() queryset.
+    return Post.published.filter(id=id).annotate(
+        last_comment=Max('comments__updated', filter=Q(comments__active=True)),
+    ).values('update', 'last_comment', 'active_comment_count')
+
+
+def _detail_validators(id, row, image_generation):
+    # No Last-Modified: deleting or hiding the newest comment moves the
+    # latest change back in time, so If-Modified-Since would get a stale 304.
+    # The ETag (which also counts the comments) is the only validator.
+    if row is None:
+        return None
+    last_modified = _latest(row['update'], row['last_comment'])
+    return _etag(id, last_modified, row['active_comment_count'], image_generation)
+
+
+# Aggregates behind the post list validators. The count catches deleted
+# and unpublished posts, which leave the latest dates unchanged.
+LIST_AGGREGATES = {
+    'last_publish': Max('publish'),
+    'last_update': Max('update'),
+    'published': Count('id'),
+}
+
+
+def _list_validators(request, row, image_generation):
+    # ETag only, for the same reason as the detail page: removals don't
+    # move the latest dates forward.
+    last_modified = _latest(row['last_publish'], row['last_update'])
+    if last_modified is None:
+        return None
+    return _etag(
+        last_modified,
+        row['published'],
+        image_generation,
+        request.GET.get('page'),
+        request.GET.get('cursor'),
+    )
+
+
+@_memoize
+def post_detail_validators(request, id):
+    """
+    ETag of a post detail page: the post's `update` with the latest change
+    and number of its active comments, and the image generation. None for
+    unknown posts.
+    """
+    with reading_from_primary(recently_bumped(DETAIL_SCOPES)):
+        return _detail_validators(id, _detail_row(id).first(), generations(IMAGE_SCOPES))
+
+
+async def apost_detail_validators(request, id):
+    """
+    Async version of post_detail_validators().
+    """
+    with reading_from_primary(await arecently_bumped(DETAIL_SCOPES)):
+        return _detail_validators(id, await _detail_row(id).afirst(), await agenerations(IMAGE_SCOPES))
+
+
+@_memoize
+def post_list_validators(request):
+    """
+    ETag of a post list page: the latest `publish` and `update` and the
+    number of the published posts, the image generation, and the requested
+    page.
+    """
+    with reading_from_primary(recently_bumped(LIST_SCOPES)):
+        return _list_validators(request, Post.published.aggregate(**LIST_AGGREGATES), generations(IMAGE_SCOPES))
+
+
+async def apost_list_validators(request):
+    """
+    Async version of post_list_validators().
+    """
+    with reading_from_primary(await arecently_bumped(LIST_SCOPES)):
+        return _list_validators(
+            request,
+            await Post.published.aaggregate(**LIST_AGGREGATES),
+            await agenerations(IMAGE_SCOPES),
+        )
+
+
+def post_detail_etag(request, id):
+    return post_detail_validators(request, id)
+
+
+def post_list_etag(request, *args, **kwargs):
+    return post_list_validators(request)
@@ -0,0 +1,187 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two flushes of the buffered views to the database.
+# 0 writes every view right away (useful for scripts and tests).
+FLUSH_INTERVAL = getattr(settings, 'BLOG_VIEW_COUNTER_FLUSH_INTERVAL', 10)
+
+# Buffered views that trigger an early flush. Together with FLUSH_INTERVAL it
+# bounds how many views a crashed process can lose.
+MAX_PENDING = getattr(settings, 'BLOG_VIEW_COUNTER_MAX_PENDING', 5000)
+
+
+class ViewCounter:
+    """
+    Post view counter buffered in process memory.
+
+    hit() only increments a dict entry under a lock; a daemon thread writes
+    the totals every FLUSH_INTERVAL seconds (or once MAX_PENDING views are
+    waiting) with one `views = views + n` UPDATE per distinct n, so a post
+    read a thousand times between two flushes costs one row update.
+    """
+
+    def __init__(self, interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._reset()
+
+    def _reset(self):
+        # Also called in forked children, which must not inherit the parent's buffer.
+        self._pid = os.getpid()
+        self._pending = Counter()
+        self._pending_views = 0
+        self._oldest_pending = None
+        self._thread = None
+        self.flushes = 0
+        self.flushed_views = 0
+        self.failed_flushes = 0
+        self.last_flush_duration = None
+        self.last_flush_at = None
+
+    def hit(self, post_id):
+        """
+        Count one view of the post with id `post_id`.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            self._pending[post_id] += 1
+            self._pending_views += 1
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+            backlog = self._pending_views
+            self._ensure_thread()
+        if self.interval <= 0:
+            self.flush()
+        elif backlog >= self.max_pending:
+            self._wake.set()
+
+    async def ahit(self, post_id):
+        """
+        Async version of hit(). Only counters flushing on every view
+        (interval 0) leave the event loop, to write in a thread.
+        """
+        if self.interval <= 0:
+            await sync_to_async(self.hit)(post_id)
+        else:
+            self.hit(post_id)
+
+    def _ensure_thread(self):
+        if self.interval > 0 and (self._thread is None or not self._thread.is_alive()):
+            self._thread = threading.Thread(
+                target=self._run,
+                name='view-counter',
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            # The thread owns its DB connection.
+            close_old_connections()
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered views to Post.views. Returns the number of views
+        written; on failure they go back to the buffer for the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+                self._pending_views = 0
+                self._oldest_pending = None
+            if not pending:
+                return 0
+
+            # Posts sharing an increment are updated together, in id order
+            # so concurrent flushes from several processes can't deadlock.
+            by_increment = defaultdict(list)
+            for post_id, views in pending.items():
+                by_increment[views].append(post_id)
+
+            started = time.monotonic()
+            now = timezone.now()
+            try:
+                with transaction.atomic():
+                    for views, post_ids in sorted(by_increment.items()):
+                        Post.objects.filter(pk__in=sorted(post_ids)).update(
+                            views=F('views') + views,
+                            last_viewed=now,
+                        )
+            except Exception:
+                logger.exception('Flushing %d post views failed', sum(pending.values()))
+                with self._lock:
+                    self._pending.update(pending)
+                    self._pending_views += sum(pending.values())
+                    if self._oldest_pending is None:
+                        self._oldest_pending = started
+                    self.failed_flushes += 1
+                return 0
+
+            total = sum(pending.values())
+            with self._lock:
+                self.flushes += 1
+                self.flushed_views += total
+                self.last_flush_duration = time.monotonic() - started
+                self.last_flush_at = time.time()
+            return total
+
+    def metrics(self):
+        """
+        Snapshot of the counter's backlog and flush statistics.
+        """
+        with self._lock:
+            return {
+                'pending_views': self._pending_views,
+                'pending_posts': len(self._pending),
+                'oldest_pending_seconds': (
+                    time.monotonic() - self._oldest_pending
+                    if self._oldest_pending is not None else 0
+                ),
+                'flushes': self.flushes,
+                'flushed_views': self.flushed_views,
+                'failed_flushes': self.failed_flushes,
+                'last_flush_duration_seconds': self.last_flush_duration,
+                'last_flush_at': self.last_flush_at,
+            }
+
+
+view_counter = ViewCounter()
+
+# Write what's left when the process exits cleanly.
+atexit.register(view_counter.flush)
+
+
+def counts_views(view):
+    """
+    Decorator counting a view of the post `id` for every successful (or
+    not modified) response of a detail view.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            view_counter.hit(kwargs['id'])
+        return response
+    return wrapper
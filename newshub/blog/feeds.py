@@ -0,0 +1,264 @@
+import hashlib
+import json
+from email.utils import format_datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Case, F, TextField, Value, When
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .cache import generations, get_cache, PREFIX
+from .forms import SearchForm
+from .models import Post, as_gregorian
+from .rendering import render_markdown
+from .search import search_queryset
+
+# Number of posts in every feed.
+FEED_ITEMS = getattr(settings, 'BLOG_FEED_ITEMS', 50)
+
+# Title of the feeds.
+FEED_TITLE = getattr(settings, 'BLOG_FEED_TITLE', 'News Hub')
+
+# Seconds a generated feed is kept; entries are keyed on the feed's content,
+# so they never serve outdated posts.
+CACHE_TIMEOUT = getattr(settings, 'BLOG_FEED_CACHE_TIMEOUT', 24 * 3600)
+
+# Seconds clients and proxies may reuse a feed without revalidating it.
+MAX_AGE = getattr(settings, 'BLOG_FEED_MAX_AGE', 300)
+
+CONTENT_TYPES = {
+    'rss': 'application/rss+xml; charset=utf-8',
+    'atom': 'application/atom+xml; charset=utf-8',
+    'json': 'application/feed+json; charset=utf-8',
+}
+
+# Columns read per item. The Markdown source is only fetched for posts
+# whose HTML hasn't been pre-rendered yet.
+ITEM_FIELDS = {
+    'markdown': Case(
+        When(description_html='', then=F('description')),
+        default=Value(''),
+        output_field=TextField(),
+    ),
+}
+
+
+def _items(queryset, request):
+    """
+    Stream the feed items of `queryset` as dicts, one DB round trip per chunk.
+    """
+    rows = queryset.annotate(**ITEM_FIELDS).values(
+        'id',
+        'title',
+        'publish',
+        'update',
+        'description_html',
+        'markdown',
+        'author__username',
+    )[:FEED_ITEMS]
+    for row in rows.iterator(chunk_size=FEED_ITEMS):
+        yield {
+            'id': row['id'],
+            'title': row['title'],
+            'link': request.build_absolute_uri(reverse('blog:post_detail', args=[row['id']])),
+            'published': as_gregorian(row['publish']),
+            'updated': as_gregorian(row['update']),
+            'author': row['author__username'],
+            'html': row['description_html'] or render_markdown(row['markdown']),
+        }
+
+
+def _rss(meta, items):
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" '
+        'xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>'
+        f'<title>{escape(meta["title"])}</title>'
+        f'<link>{escape(meta["link"])}</link>'
+        f'<description>{escape(meta["title"])}</description>'
+        f'<atom:link href={quoteattr(meta["self"])} rel="self"/>'
+    )
+    if meta['updated']:
+        yield f'<lastBuildDate>{format_datetime(meta["updated"])}</lastBuildDate>'
+    for item in items:
+        yield (
+            '<item>'
+            f'<title>{escape(item["title"])}</title>'
+            f'<link>{escape(item["link"])}</link>'
+            f'<guid isPermaLink="true">{escape(item["link"])}</guid>'
+            f'<pubDate>{format_datetime(item["published"])}</pubDate>'
+            f'<dc:creator>{escape(item["author"])}</dc:creator>'
+            f'<description>{escape(item["html"])}</description>'
+            '</item>'
+        )
+    yield '</channel></rss>\n'
+
+
+def _atom(meta, items):
+    updated = meta['updated'].isoformat() if meta['updated'] else ''
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom">'
+        f'<title>{escape(meta["title"])}</title>'
+        f'<link href={quoteattr(meta["link"])} rel="alternate"/>'
+        f'<link href={quoteattr(meta["self"])} rel="self"/>'
+        f'<id>{escape(meta["self"])}</id>'
+        f'<updated>{updated}</updated>'
+    )
+    for item in items:
+        yield (
+            '<entry>'
+            f'<title>{escape(item["title"])}</title>'
+            f'<link href={quoteattr(item["link"])} rel="alternate"/>'
+            f'<id>{escape(item["link"])}</id>'
+            f'<published>{item["published"].isoformat()}</published>'
+            f'<updated>{item["updated"].isoformat()}</updated>'
+            f'<author><name>{escape(item["author"])}</name></author>'
+            f'<content type="html">{escape(item["html"])}</content>'
+            '</entry>'
+        )
+    yield '</feed>\n'
+
+
+def _json(meta, items):
+    head = json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': meta['title'],
+        'home_page_url': meta['link'],
+        'feed_url': meta['self'],
+    }, ensure_ascii=False)
+    # Everything but the closing brace, then the items one by one.
+    yield head[:-1] + ', "items": ['
+    separator = ''
+    for item in items:
+        yield separator + json.dumps({
+            'id': str(item['id']),
+            'url': item['link'],
+            'title': item['title'],
+            'content_html': item['html'],
+            'date_published': item['published'].isoformat(),
+            'date_modified': item['updated'].isoformat(),
+            'authors': [{'name': item['author']}],
+        }, ensure_ascii=False)
+        separator = ', '
+    yield ']}\n'
+
+
+WRITERS = {
+    'rss': _rss,
+    'atom': _atom,
+    'json': _json,
+}
+
+
+def _cached_stream(key, chunks):
+    """
+    Yield the encoded chunks and cache the whole feed once it is complete.
+    An interrupted download leaves the cache alone.
+    """
+    body = []
+    for chunk in chunks:
+        data = chunk.encode()
+        body.append(data)
+        yield data
+    get_cache().set(key, b''.join(body), CACHE_TIMEOUT)
+
+
+def _feed_response(request, feed_format, queryset, title, version):
+    """
+    Answer a feed request from the client's copy (304), the feed cache, or a
+    fresh streamed rendering of `queryset`. `version` is (latest update, parts)
+    identifying the feed's content.
+    """
+    if feed_format not in WRITERS:
+        raise Http404('Unknown feed format.')
+    last_modified, parts = version
+    # Items carry absolute links, so the host is part of the key.
+    digest = hashlib.sha1(repr((request.build_absolute_uri(), parts)).encode()).hexdigest()
+    etag = f'"{digest}"'
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if not_modified is None:
+        key = f'{PREFIX}:feed:{digest}'
+        body = get_cache().get(key)
+        if body is not None:
+            response = HttpResponse(body, content_type=CONTENT_TYPES[feed_format])
+        else:
+            meta = {
+                'title': title,
+                'link': request.build_absolute_uri(reverse('blog:post_list')),
+                'self': request.build_absolute_uri(),
+                'updated': last_modified,
+            }
+            chunks = WRITERS[feed_format](meta, _items(queryset, request))
+            response = StreamingHttpResponse(
+                _cached_stream(key, chunks),
+                content_type=CONTENT_TYPES[feed_format],
+            )
+    else:
+        response = not_modified
+
+    response['ETag'] = etag
+    if timestamp:
+        response['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, public=True, max_age=MAX_AGE)
+    return response
+
+
+def _list_version(queryset):
+    """
+    Version of a feed listing the latest posts of `queryset`: the ids and
+    update times of its items, read from the publish index in one query.
+    """
+    rows = list(queryset.order_by('-publish').values_list('id', 'update')[:FEED_ITEMS])
+    updates = [as_gregorian(update) for _, update in rows]
+    return max(updates, default=None), rows
+
+
+def post_feed(request, feed_format):
+    """
+    Latest published posts.
+    """
+    queryset = Post.published.order_by('-publish')
+    return _feed_response(request, feed_format, queryset, FEED_TITLE, _list_version(queryset))
+
+
+def author_feed(request, username, feed_format):
+    """
+    Latest published posts of one author.
+    """
+    author = get_object_or_404(User, username=username)
+    queryset = Post.published.filter(author=author).order_by('-publish')
+    return _feed_response(
+        request,
+        feed_format,
+        queryset,
+        f'{FEED_TITLE} - {author.username}',
+        _list_version(queryset),
+    )
+
+
+def search_feed(request, feed_format):
+    """
+    Best matches of the `query` parameter.
+    """
+    form = SearchForm(data=request.GET)
+    if not form.is_valid():
+        raise Http404('Missing search query.')
+    query = form.cleaned_data['query']
+    # Any post or image write may change the results: key on the latest
+    # update overall plus the generations of both.
+    latest = Post.published.order_by('-update').values_list('update', flat=True).first()
+    return _feed_response(
+        request,
+        feed_format,
+        search_queryset(query),
+        f'{FEED_TITLE} - {query}',
+        (as_gregorian(latest), generations(('post', 'image'))),
+    )
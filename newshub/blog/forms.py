@@ -1,5 +1,17 @@
+import warnings
+
 from django import forms
+from django.conf import settings
 from .models import Comment, Post
+from .uploadhandlers import MAX_UPLOAD_BYTES
+
+# Need to install ( pip install pillow )
+from PIL import Image as PILImage
+
+# Limits checked on the image header, before any pixel is decoded.
+MAX_IMAGE_PIXELS = getattr(settings, 'BLOG_UPLOAD_MAX_PIXELS', 40_000_000)
+MAX_IMAGE_DIMENSION = getattr(settings, 'BLOG_UPLOAD_MAX_DIMENSION', 10_000)
+ALLOWED_IMAGE_FORMATS = getattr(settings, 'BLOG_UPLOAD_IMAGE_FORMATS', ['JPEG', 'PNG', 'WEBP', 'GIF'])
 
 
 class TicketForm(forms.Form):
@@ -73,12 +85,76 @@ class CommentForm(forms.ModelForm):
         }
 
 
+class HeaderValidatedImageField(forms.FileField):
+    """
+    Image field that validates uploads from their header only.
+    Unlike forms.ImageField it never calls verify() or decodes the pixels:
+    Pillow's open() reads just enough bytes to learn the format and size,
+    so an oversized image or decompression bomb is rejected in O(1) memory.
+    """
+
+    default_error_messages = {
+        'invalid_image': 'فایل ارسال شده تصویر معتبری نیست.',
+        'invalid_format': 'فرمت تصویر پشتیبانی نمی شود.',
+        'too_large': 'ابعاد تصویر بیش از حد مجاز است.',
+        'file_too_big': 'حجم فایل بیش از %(max_mb)s مگابایت است.',
+    }
+
+    def to_python(self, data):
+        # Set by BoundedTemporaryFileUploadHandler; the file's content was dropped.
+        if getattr(data, 'oversized', False):
+            raise forms.ValidationError(
+                self.error_messages['file_too_big'],
+                code='file_too_big',
+                params={'max_mb': MAX_UPLOAD_BYTES // (1024 * 1024)},
+            )
+        f = super().to_python(data)
+        if f is None:
+            return None
+
+        # The upload handler has already streamed the file to disk.
+        file = f.temporary_file_path() if hasattr(f, 'temporary_file_path') else f
+        try:
+            with warnings.catch_warnings():
+                # Treat Pillow's decompression bomb warning as a rejection.
+                warnings.simplefilter('error', PILImage.DecompressionBombWarning)
+                with PILImage.open(file) as image:
+                    image_format = image.format
+                    width, height = image.size
+        except (PILImage.DecompressionBombError, PILImage.DecompressionBombWarning):
+            # Pillow's own (process-wide) limit; MAX_IMAGE_PIXELS is checked below.
+            raise forms.ValidationError(self.error_messages['too_large'], code='too_large')
+        except Exception as exc:
+            raise forms.ValidationError(
+                self.error_messages['invalid_image'],
+                code='invalid_image',
+            ) from exc
+
+        if image_format not in ALLOWED_IMAGE_FORMATS:
+            raise forms.ValidationError(self.error_messages['invalid_format'], code='invalid_format')
+        if (width * height > MAX_IMAGE_PIXELS
+                or max(width, height) > MAX_IMAGE_DIMENSION):
+            raise forms.ValidationError(self.error_messages['too_large'], code='too_large')
+
+        f.content_type = PILImage.MIME.get(image_format)
+        f.image_size = (width, height)
+        if hasattr(f, 'seek') and callable(f.seek):
+            f.seek(0)
+        return f
+
+    def widget_attrs(self, widget):
+        attrs = super().widget_attrs(widget)
+        if isinstance(widget, forms.FileInput) and 'accept' not in widget.attrs:
+            attrs.setdefault('accept', 'image/*')
+        return attrs
+
+
 class CreatePostForm(forms.ModelForm):
     """
     Form for creating and updating posts.
     """
-    image1 = forms.ImageField(label='تصویر اول')
-    image2 = forms.ImageField(label='تصویر دوم')
+    image1 = HeaderValidatedImageField(label='تصویر اول')
+    image2 = HeaderValidatedImageField(label='تصویر دوم')
 
     class Meta:
         """
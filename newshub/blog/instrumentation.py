@@ -0,0 +1,342 @@
+"""
+Per-request performance instrumentation.
+
+RequestInstrumentation times every request; a database execute wrapper
+(installed on every connection) and the InstrumentedTemplates backend add
+the query count, SQL time and template render time of the request they run
+in. Each request gets a Server-Timing header, and the numbers are kept in
+in-process histograms labelled with the URL name (e.g. "blog:post_detail"),
+served in the Prometheus text format by metrics_view. Queries slower than
+the slow-query threshold are handed to blog.slow_queries, in and outside
+requests.
+"""
+import contextvars
+import hmac
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.urls import Resolver404, resolve
+
+from newshub.db.backends.pooled.pool import pool_metrics
+
+from . import slow_queries
+from .counters import view_counter
+
+# Adds the Server-Timing header to every response.
+SERVER_TIMING = getattr(settings, 'BLOG_SERVER_TIMING', True)
+
+# Bearer token a scraper may send to read the metrics endpoint (staff users always can).
+METRICS_TOKEN = getattr(settings, 'BLOG_METRICS_TOKEN', None)
+
+# Client addresses allowed to read the metrics endpoint without a token.
+METRICS_ALLOWED_IPS = set(getattr(settings, 'BLOG_METRICS_ALLOWED_IPS', ()))
+
+# Reverse proxies in front of the site. Requests they pass on come from
+# their address, so the client is taken from X-Forwarded-For instead.
+METRICS_TRUSTED_PROXIES = set(getattr(settings, 'BLOG_METRICS_TRUSTED_PROXIES', ()))
+
+# Monotonic statistics of the view counter and connection pools, exported
+# as counters (with a _total suffix); the other values are gauges.
+VIEW_COUNTER_TOTALS = {'flushes', 'flushed_views', 'failed_flushes'}
+POOL_TOTALS = {
+    'checkouts',
+    'waits',
+    'wait_seconds',
+    'timeouts',
+    'connections_opened',
+    'connections_closed',
+    'failed_checks',
+}
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Measurements of the current request, or None outside requests.
+_current = contextvars.ContextVar('blog_request_timings', default=None)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram with one series per label value.
+    """
+
+    def __init__(self, name, description, buckets, label='view'):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.label = label
+        self._lock = threading.Lock()
+        # label value -> [count per bucket (+Inf last), sum]
+        self._series = {}
+
+    def observe(self, value, label_value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][index] += 1
+            series[1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for label_value, (counts, total) in sorted(series.items()):
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label}}} {total}')
+            lines.append(f'{self.name}_count{{{label}}} {cumulative}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_SECONDS = Histogram(
+    'blog_request_duration_seconds',
+    'Time to produce the response, by URL name.',
+    SECONDS_BUCKETS,
+)
+SQL_SECONDS = Histogram(
+    'blog_request_sql_seconds',
+    'Time spent executing SQL per request, by URL name.',
+    SECONDS_BUCKETS,
+)
+QUERY_COUNT = Histogram(
+    'blog_request_queries',
+    'SQL queries executed per request, by URL name.',
+    QUERY_BUCKETS,
+)
+RENDER_SECONDS = Histogram(
+    'blog_request_render_seconds',
+    'Template rendering time per request (queries included), by URL name.',
+    SECONDS_BUCKETS,
+)
+HISTOGRAMS = [REQUEST_SECONDS, SQL_SECONDS, QUERY_COUNT, RENDER_SECONDS]
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding the query and its duration to the
+    current request, and reporting it to the slow-query log when slow.
+    """
+    timings = _current.get()
+    if timings is None and not slow_queries.ENABLED:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        if timings is not None:
+            timings['queries'] += 1
+            timings['sql'] += duration
+        if slow_queries.ENABLED and duration >= slow_queries.THRESHOLD:
+            slow_queries.capture(sql, params, many, duration, context, timings and timings['request'])
+
+
+def install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def _install_on_connect(sender, connection, **kwargs):
+    # Also covers the threads the async ORM runs queries in.
+    install(connection)
+
+
+connection_created.connect(_install_on_connect)
+
+
+class InstrumentedTemplate(Template):
+    """
+    Template adding its render time to the current request. Templates
+    rendered while another one renders (inclusion tags...) are part of the
+    outer render and not counted twice.
+    """
+
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None or timings['rendering']:
+            return super().render(context, request)
+        timings['rendering'] = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings['render'] += time.perf_counter() - started
+            timings['rendering'] = False
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """
+    DjangoTemplates backend returning InstrumentedTemplate objects.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class RequestInstrumentation:
+    """
+    Middleware measuring each request (see the module docstring). Keep it
+    first in MIDDLEWARE so the total covers the other middleware too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+        timings = _new_timings(request)
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = _new_timings(request)
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings)
+
+    @staticmethod
+    def _finish(request, response, timings):
+        total = time.perf_counter() - timings['started']
+        view = _view_name(request)
+        REQUEST_SECONDS.observe(total, view)
+        SQL_SECONDS.observe(timings['sql'], view)
+        QUERY_COUNT.observe(timings['queries'], view)
+        RENDER_SECONDS.observe(timings['render'], view)
+        if SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={timings["sql"] * 1000:.1f};desc="{timings["queries"]} queries", '
+                f'render;dur={timings["render"] * 1000:.1f}, '
+                f'total;dur={total * 1000:.1f}'
+            )
+        return response
+
+
+def _new_timings(request):
+    return {
+        'request': request,
+        'started': time.perf_counter(),
+        'queries': 0,
+        'sql': 0.0,
+        'render': 0.0,
+        'rendering': False,
+    }
+
+
+def _view_name(request):
+    # Responses served by middleware (page cache hits) never reach the resolver.
+    match = request.resolver_match
+    if match is None:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return 'unresolved'
+    return match.view_name or 'unnamed'
+
+
+def _metrics(prefix, rows, totals):
+    """
+    Lines of `rows`, a list of (labels, {name: value}); one metric per name,
+    a counter for the names in `totals` and a gauge for the others.
+    """
+    lines = []
+    for name in dict.fromkeys(name for _, values in rows for name in values):
+        samples = [(labels, values[name]) for labels, values in rows if values.get(name) is not None]
+        if samples:
+            metric, kind = (f'{prefix}_{name}_total', 'counter') if name in totals else (f'{prefix}_{name}', 'gauge')
+            lines.append(f'# TYPE {metric} {kind}')
+            lines.extend(f'{metric}{labels} {value}' for labels, value in samples)
+    return lines
+
+
+def metrics_text():
+    """
+    Histograms, view counter and connection pool metrics of this process,
+    in the Prometheus text format.
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose())
+    lines.extend(_metrics('blog_view_counter', [('', view_counter.metrics())], VIEW_COUNTER_TOTALS))
+    lines.extend(_metrics('blog_db_pool', [
+        (f'{{database="{_escape(alias)}"}}', metrics)
+        for alias, metrics in pool_metrics().items()
+    ], POOL_TOTALS))
+    return '\n'.join(lines) + '\n'
+
+
+def _client_ip(request):
+    """
+    Address of the client. Behind METRICS_TRUSTED_PROXIES it is the last
+    X-Forwarded-For entry not added by one of them, or None when the
+    proxies didn't say who they forwarded for.
+    """
+    address = request.META.get('REMOTE_ADDR')
+    if address not in METRICS_TRUSTED_PROXIES:
+        return address
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    for address in reversed([part.strip() for part in forwarded.split(',')]):
+        if address not in METRICS_TRUSTED_PROXIES:
+            return address or None
+    return None
+
+
+def _has_metrics_token(request):
+    scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return bool(METRICS_TOKEN) and scheme.lower() == 'bearer' and hmac.compare_digest(
+        token.strip().encode(), METRICS_TOKEN.encode(),
+    )
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint, for scrapers sending METRICS_TOKEN, clients
+    in METRICS_ALLOWED_IPS and staff users.
+    """
+    user = getattr(request, 'user', None)
+    allowed = (
+        _has_metrics_token(request)
+        or _client_ip(request) in METRICS_ALLOWED_IPS
+        or (user and user.is_staff)
+    )
+    if not allowed:
+        raise PermissionDenied
+    return HttpResponse(metrics_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,127 @@
+import asyncio
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from blog.models import Post
+
+# Authorization makes the page cache let the requests through to the views.
+HEADERS = {'Authorization': 'benchmark'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve the same pages through the WSGI handler (sync views, one thread per '
+        'concurrent request) and the ASGI handler (async views on one event loop), '
+        'and compare their throughput and latency. Everything runs in-process, so '
+        'the numbers compare the two code paths, not a production server.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Requests sent per page and handler.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=20,
+            help='Requests in flight at once (threads for WSGI, tasks for ASGI).',
+        )
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        concurrency = options['concurrency']
+        post_id = Post.published.order_by('-publish').values_list('id', flat=True).first()
+        if post_id is None:
+            raise CommandError('There are no published posts to request.')
+
+        pages = [
+            ('index', reverse('blog:index'), reverse('blog:async_index')),
+            ('post list', reverse('blog:post_list'), reverse('blog:async_post_list')),
+            (
+                'post detail',
+                reverse('blog:post_detail', args=[post_id]),
+                reverse('blog:async_post_detail', args=[post_id]),
+            ),
+        ]
+        for name, sync_path, async_path in pages:
+            for handler, path, run in (
+                ('WSGI', sync_path, self._run_wsgi),
+                ('ASGI', async_path, self._run_asgi),
+            ):
+                elapsed, latencies, failures = run(path, requests, concurrency)
+                self.stdout.write(self._report(f'{name} ({handler})', elapsed, latencies, failures))
+
+    @staticmethod
+    def _run_wsgi(path, requests, concurrency):
+        latencies = []
+        failures = []
+        remaining = iter(range(requests))
+        lock = threading.Lock()
+
+        def worker():
+            # One client (and DB connection) per thread, as in a threaded server.
+            client = Client()
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    started = time.perf_counter()
+                    response = client.get(path, headers=HEADERS)
+                    latencies.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        failures.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, latencies, failures
+
+    @staticmethod
+    def _run_asgi(path, requests, concurrency):
+        latencies = []
+        failures = []
+
+        async def run():
+            client = AsyncClient()
+            slots = asyncio.Semaphore(concurrency)
+
+            async def send():
+                async with slots:
+                    started = time.perf_counter()
+                    response = await client.get(path, headers=HEADERS)
+                    latencies.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        failures.append(response.status_code)
+
+            await asyncio.gather(*(send() for _ in range(requests)))
+
+        started = time.perf_counter()
+        asyncio.run(run())
+        return time.perf_counter() - started, latencies, failures
+
+    def _report(self, label, elapsed, latencies, failures):
+        latencies = sorted(latencies)
+        p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+        line = (
+            f'{label:<22} {len(latencies) / elapsed:8.1f} req/s   '
+            f'mean {statistics.mean(latencies) * 1000:7.1f} ms   '
+            f'p95 {p95 * 1000:7.1f} ms'
+        )
+        if failures:
+            return self.style.ERROR(f'{line}   {len(failures)} failed (status {failures[0]})')
+        return line
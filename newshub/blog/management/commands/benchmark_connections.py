@@ -0,0 +1,105 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from newshub.db.backends.pooled.pool import close_pool
+
+BACKENDS = {
+    'direct': 'django.db.backends.postgresql',
+    'pooled': 'newshub.db.backends.pooled',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the connection overhead of a request (connect, SELECT 1, close) '
+        'with a fresh PostgreSQL connection each time and with the pooled backend.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database whose settings are used.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Simulated requests per backend.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Threads sending requests at once.',
+        )
+
+    def handle(self, *args, **options):
+        settings_dict = connections[options['database']].settings_dict
+        if connections[options['database']].vendor != 'postgresql':
+            raise CommandError('Connection pooling is only available for PostgreSQL.')
+
+        for name, engine in BACKENDS.items():
+            # An alias of its own, so the benchmark doesn't share the site's
+            # pool. It is registered because connect hooks (e.g. the hstore
+            # lookup of django.contrib.postgres) look the alias up.
+            alias = f'{options["database"]}-benchmark-{name}'
+            connections.settings[alias] = {**settings_dict, 'ENGINE': engine}
+            try:
+                elapsed, latencies = self._run(alias, options['requests'], options['concurrency'])
+                latencies.sort()
+                self.stdout.write(
+                    f'{name:<7} {len(latencies) / elapsed:8.1f} req/s   '
+                    f'mean {statistics.mean(latencies) * 1000:7.2f} ms   '
+                    f'p95 {latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000:7.2f} ms'
+                )
+                if name == 'pooled':
+                    metrics = connections[alias].pool.metrics()
+                    self.stdout.write(
+                        f"        {metrics['connections_opened']} connections opened for "
+                        f"{metrics['checkouts']} checkouts, {metrics['waits']} waited "
+                        f"({metrics['wait_seconds'] * 1000:.1f} ms in total)"
+                    )
+            finally:
+                close_pool(alias)
+                del connections.settings[alias]
+
+    @staticmethod
+    def _run(alias, requests, concurrency):
+        latencies = []
+        errors = []
+        remaining = iter(range(requests))
+        lock = threading.Lock()
+
+        def worker():
+            # connections[alias] is per thread, like a request's connection.
+            wrapper = connections[alias]
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    started = time.perf_counter()
+                    wrapper.ensure_connection()
+                    with wrapper.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                    wrapper.close()
+                    latencies.append(time.perf_counter() - started)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                wrapper.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise CommandError(f'{len(errors)} of {concurrency} threads failed: {errors[0]}')
+        return time.perf_counter() - started, latencies
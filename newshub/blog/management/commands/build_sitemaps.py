@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.sitemaps import build_sitemaps, SITEMAP_ROOT
+
+
+class Command(BaseCommand):
+    help = 'Write the sitemap index and regenerate the shards whose posts changed. Run it periodically (e.g. from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate every shard, ignoring the manifest.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written, unchanged, removed = build_sitemaps(force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{written} shards written, {unchanged} unchanged, {removed} removed '
+            f'in {SITEMAP_ROOT} ({time.perf_counter() - started:.2f}s).'
+        ))
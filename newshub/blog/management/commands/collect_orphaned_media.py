@@ -0,0 +1,102 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from blog.models import Image, ImageRendition
+
+
+def _scan(directory, root, min_mtime):
+    """
+    List the files under `directory` older than `min_mtime`, as (name, size)
+    pairs with names relative to `root` (i.e. as stored in FileFields).
+    """
+    found = []
+    stack = [directory]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_mtime < min_mtime:
+                        name = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                        found.append((name, stat.st_size))
+    return found
+
+
+class Command(BaseCommand):
+    help = 'Delete files under MEDIA_ROOT/post_images that no Image or ImageRendition row references.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the orphaned files.',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Ignore files modified in the last N seconds (uploads still in flight).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of file names checked against the database per query.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of directories scanned in parallel.',
+        )
+
+    def handle(self, *args, **options):
+        root = settings.MEDIA_ROOT
+        base = os.path.join(root, 'post_images')
+        if not os.path.isdir(base):
+            self.stdout.write('Nothing to scan.')
+            return
+
+        # One scan task per year folder, run in parallel.
+        min_mtime = time.time() - options['min_age']
+        directories = [entry.path for entry in os.scandir(base) if entry.is_dir()]
+        loose = [
+            (os.path.relpath(entry.path, root).replace(os.sep, '/'), entry.stat().st_size)
+            for entry in os.scandir(base)
+            if entry.is_file() and entry.stat().st_mtime < min_mtime
+        ]
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            scans = executor.map(lambda d: _scan(d, root, min_mtime), directories)
+            files = loose + [item for scan in scans for item in scan]
+
+        chunk_size = options['chunk_size']
+        orphans = reclaimed = 0
+        for start in range(0, len(files), chunk_size):
+            chunk = dict(files[start:start + chunk_size])
+            referenced = set(
+                Image.objects.filter(image_file__in=chunk).values_list('image_file', flat=True)
+            ) | set(
+                ImageRendition.objects.filter(file__in=chunk).values_list('file', flat=True)
+            )
+            for name, size in chunk.items():
+                if name in referenced:
+                    continue
+                orphans += 1
+                reclaimed += size
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    default_storage.delete(name)
+
+        action = 'Found' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {orphans} orphaned files ({reclaimed / 1024 / 1024:.1f} MB) '
+            f'out of {len(files)} scanned.'
+        ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.cache import bump
+from blog.trending import compute_trending
+
+
+class Command(BaseCommand):
+    help = 'Update the trending scores of the posts with new views, comments or edits. Run it periodically (e.g. from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Drop the ranking and score every published post from scratch.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of posts read and updated per query.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = compute_trending(full=options['full'], batch_size=options['batch_size'])
+        bump('ranking')
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['ranked']} posts ranked ({result['added']} new), "
+            f"{result['removed']} removed{', epoch rebased' if result['rebased'] else ''} "
+            f"in {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Image
+from blog.renditions import generate_renditions
+
+
+class Command(BaseCommand):
+    help = 'Generate the missing resized copies of every image (e.g. after changing sizes or formats).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate every rendition, even existing ones.',
+        )
+
+    def handle(self, *args, **options):
+        images = written = 0
+        for image in Image.objects.order_by('id').iterator(chunk_size=200):
+            try:
+                written += generate_renditions(image, force=options['force'])
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'Image {image.pk} ({image.image_file.name}): {error}')
+            images += 1
+        self.stdout.write(self.style.SUCCESS(f'{written} renditions written for {images} images.'))
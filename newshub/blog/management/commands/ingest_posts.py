@@ -0,0 +1,240 @@
+import json
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from xml.etree.ElementTree import iterparse
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.template.defaultfilters import slugify
+from django.utils import timezone
+
+from blog.cache import bump
+from blog.models import Post, Image, SiteStats, AuthorStats
+from blog.rendering import estimate_reading_time
+
+# XML namespaces of the Atom and Media RSS elements read from feeds.
+ATOM = '{http://www.w3.org/2005/Atom}'
+MEDIA = '{http://search.yahoo.com/mrss/}'
+
+
+def _local_media_name(url):
+    """
+    Turn a media URL into a name relative to MEDIA_ROOT, or None if the file
+    isn't served from our own media folder (remote files aren't downloaded).
+    """
+    if url and url.startswith(settings.MEDIA_URL):
+        return url[len(settings.MEDIA_URL):]
+    return None
+
+
+def read_jsonl(path):
+    """
+    Yield (position, article dict) per non-empty line of a JSON Lines file.
+    Each line holds title, description, and optionally slug, publish
+    (ISO 8601) and images ([{"file", "title", "description"}], with file
+    relative to MEDIA_ROOT). A malformed line yields its ValueError instead
+    of a dict, so the import can skip it and go on.
+    """
+    with open(path, encoding='utf-8') as lines:
+        for number, line in enumerate(lines, 1):
+            if line.strip():
+                try:
+                    article = json.loads(line)
+                except ValueError as error:
+                    article = error
+                yield f'line {number}', article
+
+
+def read_feed(path):
+    """
+    Yield (position, article dict) per RSS <item> or Atom <entry>, parsing
+    the file incrementally and discarding every element once it has been read.
+    """
+    number = 0
+    for _, element in iterparse(path, events=('end',)):
+        if element.tag in ('item', f'{ATOM}entry'):
+            number += 1
+        if element.tag == 'item':
+            images = [
+                {'file': _local_media_name(node.get('url')), 'title': node.findtext(f'{MEDIA}title')}
+                for node in element.findall('enclosure') + element.findall(f'{MEDIA}content')
+            ]
+            yield f'item {number}', {
+                'title': element.findtext('title', ''),
+                'description': element.findtext('description', ''),
+                'publish': element.findtext('pubDate'),
+                'images': [image for image in images if image['file']],
+            }
+            element.clear()
+        elif element.tag == f'{ATOM}entry':
+            yield f'entry {number}', {
+                'title': element.findtext(f'{ATOM}title', ''),
+                'description': (
+                    element.findtext(f'{ATOM}content')
+                    or element.findtext(f'{ATOM}summary', '')
+                ),
+                'publish': element.findtext(f'{ATOM}published') or element.findtext(f'{ATOM}updated'),
+                'images': [],
+            }
+            element.clear()
+
+
+def parse_publish(value):
+    """
+    Parse an ISO 8601 or RFC 822 date; missing values mean now.
+    """
+    if not value:
+        return timezone.now()
+    try:
+        moment = datetime.fromisoformat(value.strip())
+    except ValueError:
+        moment = parsedate_to_datetime(value.strip())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def validate_article(article):
+    """
+    Raise ValueError for a record that can't become a post: not an object,
+    without a title (which the slug is made from), or whose images aren't
+    a list of objects.
+    """
+    if not isinstance(article, dict):
+        raise ValueError(f'expected an object, got {type(article).__name__}')
+    title = article.get('title')
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError('missing title')
+    images = article.get('images')
+    if images is not None and (
+        not isinstance(images, list)
+        or not all(isinstance(image, dict) for image in images)
+    ):
+        raise ValueError('images must be a list of objects')
+
+
+class Command(BaseCommand):
+    help = 'Bulk-import articles from JSON Lines, RSS or Atom files with batched inserts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='+',
+            help='Files to import (.jsonl, .rss, .xml or .atom).',
+        )
+        parser.add_argument(
+            '--author',
+            required=True,
+            help='Username the imported posts are attributed to.',
+        )
+        parser.add_argument(
+            '--status',
+            choices=[choice for choice, _ in Post.Status.choices],
+            default=Post.Status.PUBLISHED,
+            help='Status of the imported posts.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of posts written per INSERT.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.author = User.objects.get(username=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['author']}' does not exist.")
+        self.status = options['status']
+        self.verbosity = options['verbosity']
+        batch_size = options['batch_size']
+
+        started = time.perf_counter()
+        self.posts = self.images = skipped = 0
+        batch = []
+        for path in options['paths']:
+            reader = read_jsonl if path.endswith(('.jsonl', '.json')) else read_feed
+            for position, article in reader(path):
+                # One bad record (malformed JSON, missing title, unparseable
+                # date...) is reported and skipped, not the whole import.
+                try:
+                    if isinstance(article, Exception):
+                        raise article
+                    validate_article(article)
+                    post = self._build_post(article)
+                except (ValueError, KeyError, TypeError) as error:
+                    skipped += 1
+                    self.stderr.write(f'{path}, {position}: skipped ({type(error).__name__}: {error})')
+                    continue
+                batch.append((post, article))
+                if len(batch) >= batch_size:
+                    self._write(batch)
+                    self._report(started)
+
+        self._write(batch)
+
+        # bulk_create skips the signal receivers, so rebuild the aggregates once.
+        SiteStats.rebuild()
+        AuthorStats.rebuild([self.author.pk])
+        bump('post', 'image')
+
+        elapsed = time.perf_counter() - started
+        rate = (self.posts + self.images) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.posts} posts and {self.images} images in {elapsed:.1f}s '
+            f'({rate:.0f} rows/sec), skipped {skipped} invalid records. '
+            f'Run `manage.py generate_renditions` for the new images.'
+        ))
+
+    def _report(self, started):
+        if self.verbosity > 1:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{self.posts} posts ({self.posts / elapsed:.0f} posts/sec)')
+
+    def _build_post(self, article):
+        # Mirror what Post.save() and the create form would fill in.
+        post = Post(
+            author=self.author,
+            title=article['title'][:250],
+            description=article.get('description') or '',
+            slug=(article.get('slug') or slugify(article['title']))[:250],
+            publish=parse_publish(article.get('publish')),
+            status=self.status,
+        )
+        post.reading_time = article.get('reading_time') or estimate_reading_time(post.description)
+        post.refresh_description_html()
+        return post
+
+    @transaction.atomic
+    def _write(self, batch):
+        if not batch:
+            return
+        posts = Post.objects.bulk_create([post for post, _ in batch])
+
+        images = [
+            Image(
+                post=post,
+                image_file=image['file'],
+                title=image.get('title'),
+                description=image.get('description'),
+            )
+            for post, (_, article) in zip(posts, batch)
+            for image in article.get('images') or []
+            if image.get('file')
+        ]
+        images = Image.objects.bulk_create(images)
+
+        # The first image of every post becomes its cover.
+        covered = []
+        for image in images:
+            if image.post.cover_image_id is None:
+                image.post.cover_image = image
+                covered.append(image.post)
+        Post.objects.bulk_update(covered, ['cover_image'])
+
+        self.posts += len(posts)
+        self.images += len(images)
+        batch.clear()
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from blog.cache import bump
+from blog.models import AuthorStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-author statistics rows from the Post table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'user_ids',
+            nargs='*',
+            type=int,
+            help='Only rebuild the rows of these user ids.',
+        )
+
+    def handle(self, *args, **options):
+        count = AuthorStats.rebuild(options['user_ids'] or None)
+        # The homepage leaderboard is cached from posts.
+        bump('post')
+        self.stdout.write(self.style.SUCCESS(f'{count} author stats rows rebuilt.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog.cache import bump
+from blog.models import SiteStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the homepage statistics row from the Post and Comment tables.'
+
+    def handle(self, *args, **options):
+        stats = SiteStats.rebuild()
+        # Drop the cached copy of the row.
+        bump('post', 'comment')
+        self.stdout.write(self.style.SUCCESS(f'Site stats rebuilt: {stats}'))
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.cache import bump
+from blog.models import AuthorStats, Comment, Post
+
+
+def active_comments():
+    """
+    Number of active comments of the outer post, as a subquery expression.
+    """
+    counts = Comment.objects.filter(
+        post=OuterRef('pk'),
+        active=True,
+    ).order_by().values('post').annotate(count=Count('id')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+class Command(BaseCommand):
+    help = (
+        'Fix Post.active_comment_count wherever it differs from the Comment table, '
+        'and the comments_received totals of the authors of those posts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of posts checked per query.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the posts whose counter is wrong.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        fixed = 0
+        last_id = 0
+        authors = set()
+
+        while True:
+            # Walk the posts by id range so every query stays small.
+            ids = list(
+                Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            stale = Post.objects.filter(id__in=ids).annotate(
+                actual=active_comments(),
+            ).exclude(active_comment_count=F('actual'))
+            if dry_run:
+                for post_id, stored, actual in stale.values_list('id', 'active_comment_count', 'actual'):
+                    self.stdout.write(f'Post {post_id}: {stored} stored, {actual} active')
+                    fixed += 1
+                continue
+            stale = list(stale.values_list('id', 'author_id'))
+            authors.update(author_id for _, author_id in stale)
+            # Recomputed in the UPDATE itself, so concurrent comments aren't lost.
+            fixed += Post.objects.filter(
+                id__in=[post_id for post_id, _ in stale],
+            ).update(active_comment_count=active_comments())
+
+        if fixed and not dry_run:
+            # Their comments_received totals summed the wrong counters.
+            AuthorStats.rebuild(user_ids=authors)
+            bump('post')
+        verb = 'wrong' if dry_run else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f'{fixed} comment counters {verb}.'))
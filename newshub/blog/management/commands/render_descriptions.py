@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+
+from blog.cache import bump
+from blog.models import Post
+from blog.rendering import markdown_hash, render_markdown
+
+
+class Command(BaseCommand):
+    help = 'Pre-render the Markdown description of every post whose stored HTML is stale.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of posts read and updated per query.',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render every post, even if its hash is current.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        force = options['force']
+        checked = rendered = 0
+        batch = []
+
+        posts = Post.objects.only(
+            'id',
+            'description',
+            'description_hash',
+        ).order_by('id').iterator(chunk_size=batch_size)
+
+        for post in posts:
+            checked += 1
+            digest = markdown_hash(post.description)
+            if not force and digest == post.description_hash:
+                continue
+            post.description_html = render_markdown(post.description)
+            post.description_hash = digest
+            batch.append(post)
+            if len(batch) >= batch_size:
+                rendered += self._flush(batch)
+
+        rendered += self._flush(batch)
+        if rendered:
+            bump('post')
+        self.stdout.write(self.style.SUCCESS(
+            f'{rendered} of {checked} post descriptions rendered.'
+        ))
+
+    @staticmethod
+    def _flush(batch):
+        # bulk_update skips save() and signals, so `update` is left untouched.
+        count = len(batch)
+        if batch:
+            Post.objects.bulk_update(batch, ['description_html', 'description_hash'])
+            batch.clear()
+        return count
@@ -0,0 +1,69 @@
+import logging
+from threading import local
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# When True, committed deletions run on the background worker pool.
+ASYNC = getattr(settings, 'BLOG_MEDIA_DELETE_ASYNC', True)
+
+_state = local()
+
+
+class _DeletionBatch:
+    """
+    Files to remove once the transaction that deleted their rows commits.
+    """
+
+    def __init__(self):
+        self.files = []
+
+    def __call__(self):
+        files, self.files = self.files, []
+        if ASYNC:
+            # Imported here: renditions imports the models, which import this module's users.
+            from .renditions import get_executor
+            get_executor().submit(delete_files, files)
+        else:
+            delete_files(files)
+
+
+def delete_files(files):
+    """
+    Remove (storage, name) pairs from their storage, logging failures.
+    """
+    for storage, name in files:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.exception('Could not delete media file %s', name)
+
+
+def delete_file_on_commit(field_file, using=DEFAULT_DB_ALIAS):
+    """
+    Schedule the file behind `field_file` for deletion after the current
+    transaction commits. Nothing is removed if it (or the savepoint the file
+    was deleted in) rolls back, and the files deleted at one savepoint level
+    are removed together by a single callback.
+    """
+    if not field_file:
+        return
+    connection = connections[using]
+    batch = getattr(_state, 'batch', None)
+
+    # Reuse the batch only if its callback is still pending on this
+    # transaction and was registered at the current savepoint: a batch from
+    # an outer level would still run if this savepoint rolled back.
+    savepoints = set(connection.savepoint_ids)
+    pending = batch is not None and connection.in_atomic_block and any(
+        callback is batch and sids == savepoints
+        for sids, callback, _ in connection.run_on_commit
+    )
+    if not pending:
+        batch = _state.batch = _DeletionBatch()
+        batch.files.append((field_file.storage, field_file.name))
+        transaction.on_commit(batch, using=using)
+    else:
+        batch.files.append((field_file.storage, field_file.name))
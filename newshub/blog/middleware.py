@@ -0,0 +1,270 @@
+import hashlib
+import re
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import parse_http_date_safe
+
+from .cache import agenerations, arecently_bumped, generations, get_cache, recently_bumped, LOCK_TIMEOUT, PREFIX
+from .counters import view_counter
+from .routers import is_sticky, reading_from_primary
+
+# Views whose anonymous GET responses are cached, with the model scopes
+# (see blog.cache) whose writes outdate them.
+CACHED_VIEWS = getattr(settings, 'BLOG_PAGE_CACHE_VIEWS', {
+    'blog:index': ('post', 'comment', 'image', 'ranking'),
+    'blog:post_list': ('post', 'image'),
+    'blog:post_detail': ('post', 'comment', 'image'),
+    'blog:post_search': ('post', 'image'),
+    'blog:api_post_list': ('post', 'image'),
+    'blog:api_post_detail': ('post', 'comment', 'image'),
+    'blog:api_post_images': ('post', 'image'),
+    'blog:async_index': ('post', 'comment', 'image', 'ranking'),
+    'blog:async_post_list': ('post', 'image'),
+    'blog:async_post_detail': ('post', 'comment', 'image'),
+    'blog:async_post_search': ('post', 'image'),
+})
+
+# Views counting a post view per response, which cached responses must count too.
+COUNTED_VIEWS = {'blog:post_detail', 'blog:async_post_detail'}
+
+# Seconds a cached page is served as fresh.
+PAGE_TIMEOUT = getattr(settings, 'BLOG_PAGE_CACHE_TIMEOUT', 60)
+
+# Seconds past expiry (or past a write) during which the old page is served
+# while one request renders the new one.
+STALE_WHILE_REVALIDATE = getattr(settings, 'BLOG_PAGE_CACHE_STALE_WHILE_REVALIDATE', 300)
+
+# Seconds past expiry during which the old page replaces a failed render.
+STALE_IF_ERROR = getattr(settings, 'BLOG_PAGE_CACHE_STALE_IF_ERROR', 3600)
+
+# Stand-in stored instead of the per-visitor CSRF token of cached forms.
+CSRF_PLACEHOLDER = '__blog_csrf_token__'
+CSRF_INPUT = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+class AnonymousPageCache:
+    """
+    Middleware serving anonymous GET requests of the CACHED_VIEWS from the blog
+    cache, so they don't reach the view or the database.
+
+    Entries record the generations of the models they depend on: after a write
+    to one of them, or once PAGE_TIMEOUT has passed, the first request renders
+    the page again while concurrent ones get the previous copy for up to
+    STALE_WHILE_REVALIDATE seconds. If rendering fails, the previous copy is
+    served for up to STALE_IF_ERROR seconds. CSRF tokens in cached forms are
+    replaced by a fresh one for every visitor, and conditional requests are
+    answered from the ETag and Last-Modified stored with the page.
+
+    Runs natively under both WSGI and ASGI, so it doesn't cost the async
+    views a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        match = self._match(request)
+        depends = CACHED_VIEWS.get(match.view_name) if match else None
+        if depends is None:
+            return self.get_response(request)
+
+        cache = get_cache()
+        key = self._key(request)
+        version = generations(depends)
+        now = time.time()
+
+        entry = cache.get(key)
+        if entry is not None and entry['version'] == version and entry['expires'] > now:
+            self._count_view(match)
+            return self._cached_response(request, entry, 'HIT')
+        stale = entry is not None and now < entry['expires'] + STALE_WHILE_REVALIDATE
+        usable_on_error = entry is not None and now < entry['expires'] + STALE_IF_ERROR
+
+        lock_key = f'{key}:lock'
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            # Another request is rendering this page.
+            if stale:
+                self._count_view(match)
+                return self._cached_response(request, entry, 'STALE')
+            return self.get_response(request)
+
+        try:
+            try:
+                with reading_from_primary(recently_bumped(depends)):
+                    response = self.get_response(request)
+            except Exception:
+                if usable_on_error:
+                    self._count_view(match)
+                    return self._cached_response(request, entry, 'STALE')
+                raise
+            if response.status_code >= 500 and usable_on_error:
+                self._count_view(match)
+                return self._cached_response(request, entry, 'STALE')
+            if self._storable(request, response):
+                cache.set(key, self._entry(response, version, now), PAGE_TIMEOUT + STALE_IF_ERROR)
+                self._patch_headers(response, csrf=bool(CSRF_INPUT.search(response.content)))
+            response['X-Page-Cache'] = 'MISS'
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    async def __acall__(self, request):
+        """
+        Async version of __call__(), using the async cache API.
+        """
+        match = self._match(request)
+        depends = CACHED_VIEWS.get(match.view_name) if match else None
+        if depends is None:
+            return await self.get_response(request)
+
+        cache = get_cache()
+        key = self._key(request)
+        version = await agenerations(depends)
+        now = time.time()
+
+        entry = await cache.aget(key)
+        if entry is not None and entry['version'] == version and entry['expires'] > now:
+            await self._acount_view(match)
+            return self._cached_response(request, entry, 'HIT')
+        stale = entry is not None and now < entry['expires'] + STALE_WHILE_REVALIDATE
+        usable_on_error = entry is not None and now < entry['expires'] + STALE_IF_ERROR
+
+        lock_key = f'{key}:lock'
+        if not await cache.aadd(lock_key, 1, LOCK_TIMEOUT):
+            if stale:
+                await self._acount_view(match)
+                return self._cached_response(request, entry, 'STALE')
+            return await self.get_response(request)
+
+        try:
+            try:
+                with reading_from_primary(await arecently_bumped(depends)):
+                    response = await self.get_response(request)
+            except Exception:
+                if usable_on_error:
+                    await self._acount_view(match)
+                    return self._cached_response(request, entry, 'STALE')
+                raise
+            if response.status_code >= 500 and usable_on_error:
+                await self._acount_view(match)
+                return self._cached_response(request, entry, 'STALE')
+            if self._storable(request, response):
+                await cache.aset(key, self._entry(response, version, now), PAGE_TIMEOUT + STALE_IF_ERROR)
+                self._patch_headers(response, csrf=bool(CSRF_INPUT.search(response.content)))
+            response['X-Page-Cache'] = 'MISS'
+            return response
+        finally:
+            await cache.adelete(lock_key)
+
+    @staticmethod
+    def _key(request):
+        host_and_path = f'{request.get_host()}{request.get_full_path()}'
+        return f'{PREFIX}:page:{hashlib.sha1(host_and_path.encode()).hexdigest()}'
+
+    @staticmethod
+    def _count_view(match):
+        # The view doesn't run for cached responses, so count the view here.
+        if match.view_name in COUNTED_VIEWS:
+            view_counter.hit(match.kwargs['id'])
+
+    @staticmethod
+    async def _acount_view(match):
+        if match.view_name in COUNTED_VIEWS:
+            await view_counter.ahit(match.kwargs['id'])
+
+    @staticmethod
+    def _match(request):
+        # Resolved URL of a cacheable request, or None.
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        # Visitors with a session (logged-in users) always get fresh pages,
+        # as do visitors who just wrote and must see their own changes.
+        if settings.SESSION_COOKIE_NAME in request.COOKIES or 'HTTP_AUTHORIZATION' in request.META:
+            return None
+        if is_sticky(request):
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        return match
+
+    @staticmethod
+    def _storable(request, response):
+        return (
+            request.method == 'GET'
+            # The page cache runs after the view's transaction (ATOMIC_REQUESTS
+            # included) has committed; a response rendered inside one still
+            # open could show rows that are rolled back, or be stored under a
+            # generation its own writes bump only after commit.
+            and not any(connection.in_atomic_block for connection in connections.all(initialized_only=True))
+            and response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and 'no-store' not in response.get('Cache-Control', '')
+            and 'private' not in response.get('Cache-Control', '')
+        )
+
+    @staticmethod
+    def _entry(response, version, now):
+        return {
+            'version': version,
+            'expires': now + PAGE_TIMEOUT,
+            'status': response.status_code,
+            'headers': [
+                (name, value) for name, value in response.items()
+                if name.lower() not in ('vary', 'set-cookie')
+            ],
+            'content': CSRF_INPUT.sub(
+                rb'\g<1>' + CSRF_PLACEHOLDER.encode() + rb'\g<2>',
+                response.content,
+            ),
+        }
+
+    @staticmethod
+    def _patch_headers(response, csrf):
+        if csrf:
+            # The page carries a per-visitor token: only the browser may keep it.
+            patch_cache_control(response, private=True, max_age=0)
+        else:
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=PAGE_TIMEOUT,
+                stale_while_revalidate=STALE_WHILE_REVALIDATE,
+                stale_if_error=STALE_IF_ERROR,
+            )
+
+    def _cached_response(self, request, entry, state):
+        content = entry['content']
+        placeholder = CSRF_PLACEHOLDER.encode()
+        csrf = placeholder in content
+        if csrf:
+            # get_token() also makes CsrfViewMiddleware set the matching cookie.
+            content = content.replace(placeholder, get_token(request).encode())
+        response = HttpResponse(content, status=entry['status'])
+        for name, value in entry['headers']:
+            response[name] = value
+        self._patch_headers(response, csrf)
+        response['X-Page-Cache'] = state
+        # Answer If-None-Match / If-Modified-Since from the stored validators.
+        return get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(response.get('Last-Modified', '')),
+            response=response,
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.7 on 2026-10-18 04:36
+
+import django.db.models.deletion
+import django_jalali.db.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_alter_comment_post_alter_image_image_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_posts', models.PositiveIntegerField(default=0, verbose_name='تعداد پست ها')),
+                ('total_comments', models.PositiveIntegerField(default=0, verbose_name='تعداد کامنت ها')),
+                ('last_post_publish', django_jalali.db.models.jDateTimeField(blank=True, null=True, verbose_name='تاریخ آخرین پست')),
+                ('most_reading_time', models.PositiveIntegerField(blank=True, null=True, verbose_name='بیشترین زمان مطالعه')),
+                ('least_reading_time', models.PositiveIntegerField(blank=True, null=True, verbose_name='کمترین زمان مطالعه')),
+                ('updated', django_jalali.db.models.jDateTimeField(auto_now=True)),
+                ('last_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blog.post', verbose_name='آخرین پست')),
+                ('least_reading_time_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blog.post', verbose_name='پست با کمترین زمان مطالعه')),
+                ('most_reading_time_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blog.post', verbose_name='پست با بیشترین زمان مطالعه')),
+            ],
+            options={
+                'verbose_name': 'آمار سایت',
+                'verbose_name_plural': 'آمار سایت',
+            },
+        ),
+    ]
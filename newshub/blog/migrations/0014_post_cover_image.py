@@ -0,0 +1,36 @@
+# Generated by Django 5.0.7 on 2026-10-18 04:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def set_cover_images(apps, schema_editor):
+    """
+    Use the first image of every existing post as its cover.
+    """
+    Post = apps.get_model('blog', 'Post')
+    Image = apps.get_model('blog', 'Image')
+    Post.objects.update(
+        cover_image=Subquery(
+            Image.objects.filter(
+                post=OuterRef('pk'),
+            ).order_by('created', 'id').values('id')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='cover_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blog.image', verbose_name='تصویر کاور'),
+        ),
+        migrations.RunPython(set_cover_images, migrations.RunPython.noop),
+    ]
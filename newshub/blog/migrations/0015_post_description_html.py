@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_post_cover_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='description_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
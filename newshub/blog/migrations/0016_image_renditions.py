@@ -0,0 +1,41 @@
+# Generated by Django 5.0.7 on 2026-10-18 04:40
+
+import blog.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_post_description_html'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='image',
+            name='image_file',
+            field=models.ImageField(upload_to=blog.models.get_upload_to, verbose_name='تصویر'),
+        ),
+        migrations.CreateModel(
+            name='ImageRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('thumbnail', 'Thumbnail'), ('list', 'List'), ('detail', 'Detail'), ('detail_2x', 'Detail 2x')], max_length=20, verbose_name='نوع')),
+                ('format', models.CharField(max_length=10, verbose_name='فرمت')),
+                ('width', models.PositiveIntegerField(verbose_name='عرض')),
+                ('height', models.PositiveIntegerField(verbose_name='ارتفاع')),
+                ('file', models.ImageField(height_field='height', upload_to=blog.models.get_rendition_upload_to, verbose_name='فایل', width_field='width')),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='blog.image', verbose_name='تصویر')),
+            ],
+            options={
+                'verbose_name': 'نسخه تصویر',
+                'verbose_name_plural': 'نسخه های تصویر',
+                'ordering': ['width'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='imagerendition',
+            constraint=models.UniqueConstraint(fields=('image', 'kind', 'format'), name='blog_rendition_unique_kind_format'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-18 04:43
+
+import django_jalali.db.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CensoredWord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(max_length=100, unique=True, verbose_name='کلمه')),
+                ('created', django_jalali.db.models.jDateTimeField(auto_now_add=True)),
+                ('updated', django_jalali.db.models.jDateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'کلمه سانسور شده',
+                'verbose_name_plural': 'کلمات سانسور شده',
+                'ordering': ['word'],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.7 on 2026-10-18 04:48
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_active_comments(apps, schema_editor):
+    """
+    Fill the counter of every existing post from its active comments.
+    """
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    counts = Comment.objects.filter(
+        post=OuterRef('pk'),
+        active=True,
+    ).order_by().values('post').annotate(count=Count('id')).values('count')
+    Post.objects.update(active_comment_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_post_update_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='active_comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد کامنت ها'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-active_comment_count'], name='blog_post_status_f8a84f_idx'),
+        ),
+        migrations.RunPython(count_active_comments, migrations.RunPython.noop),
+    ]
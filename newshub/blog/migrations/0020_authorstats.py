@@ -0,0 +1,57 @@
+# Generated by Django 5.0.7 on 2026-10-18 04:49
+
+import django.db.models.deletion
+import django_jalali.db.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_author_stats(apps, schema_editor):
+    """
+    Create the stats row of every existing author.
+    """
+    Post = apps.get_model('blog', 'Post')
+    AuthorStats = apps.get_model('blog', 'AuthorStats')
+    totals = Post.objects.order_by().values('author').annotate(
+        published_posts=Count('id', filter=Q(status='PU')),
+        draft_posts=Count('id', filter=Q(status='DF')),
+        rejected_posts=Count('id', filter=Q(status='RJ')),
+        last_publish=Max('publish', filter=Q(status='PU')),
+        comments_received=Coalesce(Sum('active_comment_count'), 0),
+    )
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=row.pop('author'), **row) for row in totals],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0019_post_active_comment_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='author_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='نویسنده')),
+                ('published_posts', models.PositiveIntegerField(default=0, verbose_name='پست های منتشر شده')),
+                ('draft_posts', models.PositiveIntegerField(default=0, verbose_name='پیش نویس ها')),
+                ('rejected_posts', models.PositiveIntegerField(default=0, verbose_name='پست های رد شده')),
+                ('last_publish', django_jalali.db.models.jDateTimeField(blank=True, null=True, verbose_name='تاریخ آخرین انتشار')),
+                ('comments_received', models.PositiveIntegerField(default=0, verbose_name='کامنت های دریافتی')),
+                ('updated', django_jalali.db.models.jDateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'آمار نویسنده',
+                'verbose_name_plural': 'آمار نویسندگان',
+                'ordering': ['-published_posts'],
+                'indexes': [models.Index(fields=['-published_posts'], name='blog_author_publish_751782_idx'), models.Index(fields=['-comments_received'], name='blog_author_comment_527666_idx')],
+            },
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
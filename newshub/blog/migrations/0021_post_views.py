@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0020_authorstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='views',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='بازدید'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.7 on 2026-10-18 04:52
+
+import django.db.models.deletion
+import django_jalali.db.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0021_post_views'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostRanking',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='blog.post', verbose_name='پست')),
+                ('score', models.FloatField(default=0, verbose_name='امتیاز')),
+                ('views_counted', models.PositiveBigIntegerField(default=0)),
+                ('comments_counted', models.PositiveIntegerField(default=0)),
+                ('updated', django_jalali.db.models.jDateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'رتبه پست',
+                'verbose_name_plural': 'رتبه پست ها',
+                'ordering': ['-score'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', django_jalali.db.models.jDateTimeField(verbose_name='مبدا زمانی')),
+                ('last_run', django_jalali.db.models.jDateTimeField(blank=True, null=True, verbose_name='آخرین اجرا')),
+            ],
+            options={
+                'verbose_name': 'وضعیت پست های داغ',
+                'verbose_name_plural': 'وضعیت پست های داغ',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_viewed',
+            field=django_jalali.db.models.jDateTimeField(blank=True, editable=False, null=True, verbose_name='آخرین بازدید'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['updated'], name='blog_commen_updated_af3518_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['last_viewed'], name='blog_post_last_vi_e6ec5a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postranking',
+            index=models.Index(fields=['-score'], name='blog_postra_score_f4f3eb_idx'),
+        ),
+    ]
@@ -10,15 +10,19 @@ from django.urls import reverse
 from django_jalali.db import models as jmodels
 import jdatetime
 
-# Importing ResizedImageField from django_resized
-# (Install with: pip install django_resized)
-from django_resized import ResizedImageField
-
-from django.db.models.signals import post_delete
-from django.dispatch import receiver
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 import os
 
 from django.template.defaultfilters import slugify
+from django.utils.safestring import mark_safe
+
+from .rendering import render_markdown, markdown_hash
+from .cache import acached_call, cached_call
 
 
 def get_upload_to(instance, filename):
@@ -35,8 +39,47 @@ def get_upload_to(instance, filename):
     return f'post_images/{year}/{filename}'
 
 
+def get_rendition_upload_to(instance, filename):
+    """
+    Function to determine the file upload path for image renditions.
+    Renditions are stored next to their original image.
+    """
+    folder = os.path.dirname(instance.image.image_file.name)
+    return f'{folder}/renditions/{filename}'
+
+
+def as_gregorian(value):
+    """
+    Convert a jdatetime value (as returned by jDateTimeField) to a standard
+    datetime so it can be compared, serialized or used in HTTP headers.
+    """
+    if isinstance(value, (jdatetime.datetime, jdatetime.date)):
+        return value.togregorian()
+    return value
+
+
+# Custom QuerySets
+class PostQuerySet(jmodels.jQuerySet):
+    """
+    QuerySet for posts with loaders that fetch their images up front.
+    """
+    def with_cover(self):
+        # Join the cover image (and prefetch its renditions) so list pages
+        # need no query per post.
+        return self.select_related('cover_image').prefetch_related('cover_image__renditions')
+
+    def with_images(self):
+        # Join the cover image and prefetch all images and their renditions
+        # in two extra queries.
+        return self.select_related('cover_image').prefetch_related('images__renditions')
+
+
+# Base manager for posts, exposing the PostQuerySet loaders.
+PostManager = models.Manager.from_queryset(PostQuerySet)
+
+
 # Custom Managers
-class PublishedManager(models.Manager):
+class PublishedManager(PostManager):
     """
     Manager to handle queries for published posts.
     """
@@ -45,7 +88,7 @@ class PublishedManager(models.Manager):
         return super().get_queryset().filter(status=Post.Status.PUBLISHED)
 
 
-class DraftManager(models.Manager):
+class DraftManager(PostManager):
     """
     Manager to handle queries for draft posts.
     """
@@ -54,7 +97,7 @@ class DraftManager(models.Manager):
         return super().get_queryset().filter(status=Post.Status.DRAFT)
 
 
-class RejectedManager(models.Manager):
+class RejectedManager(PostManager):
     """
     Manager to handle queries for rejected posts.
     """
@@ -123,8 +166,58 @@ class Post(models.Model):
         verbose_name= "زمان مطالعه",
     )
 
+    # Pre-rendered Markdown of the description and the hash it was rendered from.
+    description_html = models.TextField(
+        blank=True,
+        editable=False,
+    )
+
+    description_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+    )
+
+    # First image of the post, kept up to date by the Image signal receivers.
+    cover_image = models.ForeignKey(
+        'Image',
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="تصویر کاور",
+    )
+
+    # Number of active comments, kept up to date by the Comment signal receivers.
+    active_comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="تعداد کامنت ها",
+    )
+
+    # Number of detail page views, flushed in batches by blog.counters.
+    views = models.PositiveBigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="بازدید",
+    )
+
+    # Time of the last flushed view, read by the trending job to find active posts.
+    last_viewed = jmodels.jDateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="آخرین بازدید",
+    )
+
+    # Columns only changed through queryset updates; save() never writes them
+    # back, so saving a post loaded earlier can't undo concurrent increments
+    # or put back a cover image the Image receivers have since replaced.
+    QUERYSET_UPDATED_FIELDS = ('active_comment_count', 'views', 'last_viewed', 'cover_image')
+
     # Keeping the default manager(objects).
-    objects = jmodels.jManager()
+    objects = PostManager()
 
     # Managers for custom query sets.
     published = PublishedManager()
@@ -140,7 +233,28 @@ class Post(models.Model):
         ordering = ['-publish']
         # Indexing for faster queries on publish date.
         indexes = [
-            models.Index(fields=['-publish'])
+            models.Index(fields=['-publish']),
+            # Latest edit, used by the post list's Last-Modified / ETag.
+            models.Index(fields=['-update']),
+            # Top-N of the most commented published posts.
+            models.Index(fields=['status', '-active_comment_count']),
+            # Posts viewed since the last trending run.
+            models.Index(fields=['last_viewed']),
+            # Trigram and full text indexes used by blog.search.
+            GinIndex(
+                fields=['title'],
+                name='blog_post_title_trgm',
+                opclasses=['gin_trgm_ops'],
+            ),
+            GinIndex(
+                fields=['description'],
+                name='blog_post_desc_trgm',
+                opclasses=['gin_trgm_ops'],
+            ),
+            GinIndex(
+                SearchVector('title', 'description', config='simple'),
+                name='blog_post_search_vector',
+            ),
         ]
         verbose_name = "پست"
         verbose_name_plural = "پست ها"
@@ -157,16 +271,42 @@ class Post(models.Model):
         """
         return reverse('blog:post_detail', args=[self.id])
 
+    @property
+    def description_rendered(self):
+        """
+        HTML of the description, rendered from Markdown only if the stored copy is stale.
+        """
+        if self.description_hash != markdown_hash(self.description):
+            return mark_safe(render_markdown(self.description))
+        return mark_safe(self.description_html)
+
+    def refresh_description_html(self):
+        """
+        Re-render the description HTML if the text or Markdown config changed.
+        Returns True if the HTML was updated.
+        """
+        digest = markdown_hash(self.description)
+        if digest == self.description_hash:
+            return False
+        self.description_html = render_markdown(self.description)
+        self.description_hash = digest
+        return True
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.QUERYSET_UPDATED_FIELDS
+            ]
+            kwargs['update_fields'] = update_fields
+        if update_fields is None or 'description' in update_fields:
+            if self.refresh_description_html() and update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'description_html', 'description_hash'}
         super().save(*args, **kwargs)
         
-    def delete(self, *args, **kwargs):
-        for img in self.images.all():
-            storage, path = img.image_file.storage, img.image_file.path
-            storage.delete(path)
-        super().delete(*args, **kwargs)
 
 
 class Ticket(models.Model):
@@ -256,7 +396,9 @@ class Comment(models.Model):
         ordering = ['created']
         # Indexing for faster queries on creation date.
         indexes = [
-            models.Index(fields=['created'])
+            models.Index(fields=['created']),
+            # Comments changed since the last trending run.
+            models.Index(fields=['updated']),
         ]
         verbose_name = "کامنت"
         verbose_name_plural = "کامنت ها"
@@ -280,11 +422,9 @@ class Image(models.Model):
         verbose_name='پست',
     )
 
-    image_file = ResizedImageField(
+    # The upload is stored as-is; resized copies live in ImageRendition.
+    image_file = models.ImageField(
         upload_to=get_upload_to,
-        size=[500, 500],
-        quality=75,
-        crop=['middle', 'center'],
         verbose_name='تصویر',
     )
 
@@ -317,7 +457,18 @@ class Image(models.Model):
 
         # Indexing for faster queries on creation date.
         indexes = [
-            models.Index(fields=['created'])
+            models.Index(fields=['created']),
+            # Trigram indexes used by blog.search.
+            GinIndex(
+                fields=['title'],
+                name='blog_image_title_trgm',
+                opclasses=['gin_trgm_ops'],
+            ),
+            GinIndex(
+                fields=['description'],
+                name='blog_image_desc_trgm',
+                opclasses=['gin_trgm_ops'],
+            ),
         ]
 
         verbose_name = 'تصویر'
@@ -329,18 +480,623 @@ class Image(models.Model):
         """
         return self.title if self.title else self.image_file.name
 
-    def delete(self, *args, **kwargs):
-        storage, path = self.image_file.storage, self.image_file.path
-        storage.delete(path)
-        super().delete(*args, **kwargs)
-
-
-# Signal to delete the image file after the object is deleted.
-# @receiver(post_delete, sender=Image)
-# def delete_image_file_on_delete(sender, instance, **kwargs):
-#     """
-#     Signal receiver to delete the image file from the filesystem when an Image instance is deleted.
-#     """
-#     if instance.image_file:
-#         if os.path.isfile(instance.image_file.path):
-#             os.remove(instance.image_file.path)
+
+class ImageRendition(models.Model):
+    """
+    Model representing a resized copy of an Image in a given format,
+    generated in the background by blog.renditions.
+    """
+
+    # Sizes of the generated copies, by the place they are shown in.
+    class Kind(models.TextChoices):
+        THUMBNAIL = 'thumbnail', 'Thumbnail'
+        LIST = 'list', 'List'
+        DETAIL = 'detail', 'Detail'
+        DETAIL_2X = 'detail_2x', 'Detail 2x'
+
+    image = models.ForeignKey(
+        Image,
+        on_delete=models.CASCADE,
+        related_name='renditions',
+        verbose_name='تصویر',
+    )
+
+    kind = models.CharField(
+        max_length=20,
+        choices=Kind.choices,
+        verbose_name='نوع',
+    )
+
+    format = models.CharField(
+        max_length=10,
+        verbose_name='فرمت',
+    )
+
+    width = models.PositiveIntegerField(
+        verbose_name='عرض',
+    )
+
+    height = models.PositiveIntegerField(
+        verbose_name='ارتفاع',
+    )
+
+    file = models.ImageField(
+        upload_to=get_rendition_upload_to,
+        width_field='width',
+        height_field='height',
+        verbose_name='فایل',
+    )
+
+    class Meta:
+        """
+        Meta options for ImageRendition model.
+        """
+
+        # Smallest copies first, so srcset lists are built in order.
+        ordering = [
+            'width',
+        ]
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['image', 'kind', 'format'],
+                name='blog_rendition_unique_kind_format',
+            ),
+        ]
+
+        verbose_name = 'نسخه تصویر'
+        verbose_name_plural = 'نسخه های تصویر'
+
+    def __str__(self):
+        """
+        String representation of the ImageRendition model.
+        """
+        return f"{self.image} ({self.kind}, {self.format})"
+
+
+class CensoredWord(models.Model):
+    """
+    Model representing a word removed from user content by the censor_text filter.
+    """
+
+    word = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='کلمه',
+    )
+
+    created = jmodels.jDateTimeField(
+        auto_now_add=True,
+    )
+
+    updated = jmodels.jDateTimeField(
+        auto_now=True,
+    )
+
+    class Meta:
+        """
+        Meta options for CensoredWord model.
+        """
+        ordering = ['word']
+        verbose_name = 'کلمه سانسور شده'
+        verbose_name_plural = 'کلمات سانسور شده'
+
+    def __str__(self):
+        """
+        String representation of the CensoredWord model.
+        """
+        return self.word
+
+
+class SiteStats(models.Model):
+    """
+    Single-row model holding the numbers shown on the homepage.
+    Kept up to date incrementally by the Post and Comment signal receivers
+    (see blog/signals.py) and rebuildable with `manage.py rebuild_site_stats`.
+    """
+
+    # Primary key of the only row of this table.
+    SINGLETON_ID = 1
+
+    total_posts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='تعداد پست ها',
+    )
+
+    total_comments = models.PositiveIntegerField(
+        default=0,
+        verbose_name='تعداد کامنت ها',
+    )
+
+    last_post = models.ForeignKey(
+        Post,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        verbose_name='آخرین پست',
+    )
+
+    last_post_publish = jmodels.jDateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاریخ آخرین پست',
+    )
+
+    most_reading_time_post = models.ForeignKey(
+        Post,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        verbose_name='پست با بیشترین زمان مطالعه',
+    )
+
+    most_reading_time = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='بیشترین زمان مطالعه',
+    )
+
+    least_reading_time_post = models.ForeignKey(
+        Post,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        verbose_name='پست با کمترین زمان مطالعه',
+    )
+
+    least_reading_time = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='کمترین زمان مطالعه',
+    )
+
+    updated = jmodels.jDateTimeField(
+        auto_now=True,
+    )
+
+    class Meta:
+        """
+        Meta options for SiteStats model.
+        """
+        verbose_name = 'آمار سایت'
+        verbose_name_plural = 'آمار سایت'
+
+    def __str__(self):
+        """
+        String representation of the SiteStats model.
+        """
+        return f"{self.total_posts} posts, {self.total_comments} comments"
+
+    @classmethod
+    def _with_posts(cls):
+        # The stats row with its related posts, in a single query.
+        return cls.objects.select_related(
+            'last_post',
+            'most_reading_time_post',
+            'least_reading_time_post',
+        ).filter(pk=cls.SINGLETON_ID)
+
+    @classmethod
+    def load(cls):
+        """
+        Return the stats row (with its related posts) in a single query,
+        building it from scratch the first time it is requested.
+        """
+        stats = cls._with_posts().first()
+        if stats is None:
+            # Read back rather than returning rebuild()'s instance, whose
+            # posts only hold the columns the rebuild needed.
+            cls.rebuild()
+            stats = cls._with_posts().get()
+        return stats
+
+    @classmethod
+    def load_cached(cls):
+        """
+        Return the stats row from the blog cache, reloading it after post or
+        comment writes.
+        """
+        return cached_call('site_stats', ('post', 'comment'), cls.load)
+
+    @classmethod
+    async def aload(cls):
+        """
+        Async version of load().
+        """
+        stats = await cls._with_posts().afirst()
+        if stats is None:
+            # Rebuilding locks the row inside a transaction, which is sync only.
+            await sync_to_async(cls.rebuild)()
+            stats = await cls._with_posts().aget()
+        return stats
+
+    @classmethod
+    async def aload_cached(cls):
+        """
+        Async version of load_cached(), sharing its cache entry.
+        """
+        return await acached_call('site_stats', ('post', 'comment'), cls.aload)
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute every field from the Post and Comment tables.
+        """
+        with transaction.atomic():
+            stats, _ = cls.objects.select_for_update().get_or_create(pk=cls.SINGLETON_ID)
+            stats.total_posts = Post.published.count()
+            stats.total_comments = Comment.objects.filter(active=True).count()
+            stats._refresh_last_post()
+            stats._refresh_most_reading_time()
+            stats._refresh_least_reading_time()
+            stats.save()
+        return stats
+
+    @classmethod
+    def _locked(cls):
+        """
+        Return the stats row locked for update, or None when the row did not
+        exist yet and has just been rebuilt (so there is nothing to apply).
+        """
+        stats = cls.objects.select_for_update().filter(pk=cls.SINGLETON_ID).first()
+        if stats is None:
+            cls.rebuild()
+        return stats
+
+    def _refresh_last_post(self):
+        post = Post.published.order_by('-publish').only('id', 'publish').first()
+        self.last_post = post
+        self.last_post_publish = post.publish if post else None
+
+    def _refresh_most_reading_time(self):
+        post = Post.published.order_by('-reading_time').only('id', 'reading_time').first()
+        self.most_reading_time_post = post
+        self.most_reading_time = post.reading_time if post else None
+
+    def _refresh_least_reading_time(self):
+        post = Post.published.order_by('reading_time').only('id', 'reading_time').first()
+        self.least_reading_time_post = post
+        self.least_reading_time = post.reading_time if post else None
+
+    @classmethod
+    def post_saved(cls, post, was_published):
+        """
+        Apply the effect of saving `post` (published before or not) to the stats row.
+        """
+        is_published = post.status == Post.Status.PUBLISHED
+        with transaction.atomic():
+            stats = cls._locked()
+            if stats is None:
+                return
+            if is_published != was_published:
+                stats.total_posts = F('total_posts') + (1 if is_published else -1)
+
+            # A published post can only push a record further; anything else
+            # that touches the current record holder forces a recompute.
+            if is_published and (stats.last_post_publish is None
+                                 or as_gregorian(post.publish) >= as_gregorian(stats.last_post_publish)):
+                stats.last_post, stats.last_post_publish = post, post.publish
+            elif stats.last_post_id == post.pk:
+                stats._refresh_last_post()
+
+            if is_published and (stats.most_reading_time is None
+                                 or post.reading_time >= stats.most_reading_time):
+                stats.most_reading_time_post, stats.most_reading_time = post, post.reading_time
+            elif stats.most_reading_time_post_id == post.pk:
+                stats._refresh_most_reading_time()
+
+            if is_published and (stats.least_reading_time is None
+                                 or post.reading_time <= stats.least_reading_time):
+                stats.least_reading_time_post, stats.least_reading_time = post, post.reading_time
+            elif stats.least_reading_time_post_id == post.pk:
+                stats._refresh_least_reading_time()
+
+            stats.save()
+
+    @classmethod
+    def post_deleted(cls, post):
+        """
+        Apply the effect of deleting `post` to the stats row.
+        """
+        with transaction.atomic():
+            stats = cls._locked()
+            if stats is None:
+                return
+            if post.status == Post.Status.PUBLISHED:
+                stats.total_posts = F('total_posts') - 1
+            # The foreign keys are already nulled by SET_NULL, so compare ids.
+            if stats.last_post_id in (None, post.pk):
+                stats._refresh_last_post()
+            if stats.most_reading_time_post_id in (None, post.pk):
+                stats._refresh_most_reading_time()
+            if stats.least_reading_time_post_id in (None, post.pk):
+                stats._refresh_least_reading_time()
+            stats.save()
+
+    @classmethod
+    def comments_changed(cls, delta):
+        """
+        Add `delta` to the number of active comments.
+        """
+        if delta:
+            cls.objects.filter(pk=cls.SINGLETON_ID).update(
+                total_comments=F('total_comments') + delta,
+            )
+
+
+class AuthorStats(models.Model):
+    """
+    Per-author post and comment totals, read by the homepage leaderboard,
+    the profile page and the admin. Kept up to date incrementally by the Post
+    and Comment signal receivers and rebuildable with
+    `manage.py rebuild_author_stats`.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='author_stats',
+        verbose_name='نویسنده',
+    )
+
+    published_posts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='پست های منتشر شده',
+    )
+
+    draft_posts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='پیش نویس ها',
+    )
+
+    rejected_posts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='پست های رد شده',
+    )
+
+    last_publish = jmodels.jDateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='تاریخ آخرین انتشار',
+    )
+
+    # Active comments on all the author's posts.
+    comments_received = models.PositiveIntegerField(
+        default=0,
+        verbose_name='کامنت های دریافتی',
+    )
+
+    updated = jmodels.jDateTimeField(
+        auto_now=True,
+    )
+
+    # Counter column of every post status.
+    STATUS_FIELDS = {
+        Post.Status.PUBLISHED: 'published_posts',
+        Post.Status.DRAFT: 'draft_posts',
+        Post.Status.REJECTED: 'rejected_posts',
+    }
+
+    class Meta:
+        """
+        Meta options for AuthorStats model.
+        """
+        ordering = ['-published_posts']
+        # Leaderboards read the top rows of these indexes.
+        indexes = [
+            models.Index(fields=['-published_posts']),
+            models.Index(fields=['-comments_received']),
+        ]
+        verbose_name = 'آمار نویسنده'
+        verbose_name_plural = 'آمار نویسندگان'
+
+    def __str__(self):
+        """
+        String representation of the AuthorStats model.
+        """
+        return f"{self.user}: {self.published_posts} posts, {self.comments_received} comments"
+
+    @staticmethod
+    def _last_publish(user):
+        # Latest publish date of the author's published posts, as a subquery.
+        return Subquery(
+            Post.published.filter(
+                author=user,
+            ).order_by('-publish').values('publish')[:1]
+        )
+
+    @classmethod
+    def rebuild(cls, user_ids=None):
+        """
+        Recompute the rows of the given authors (all authors by default) from
+        the Post table. Returns the number of rows written.
+        """
+        published = Q(user_posts__status=Post.Status.PUBLISHED)
+        authors = User.objects.filter(user_posts__isnull=False).distinct()
+        if user_ids is not None:
+            authors = authors.filter(pk__in=user_ids)
+        # Every post's active comments are already counted on the post itself.
+        totals = User.objects.filter(pk__in=authors.values('pk')).annotate(
+            published_posts=Count('user_posts', filter=published),
+            draft_posts=Count('user_posts', filter=Q(user_posts__status=Post.Status.DRAFT)),
+            rejected_posts=Count('user_posts', filter=Q(user_posts__status=Post.Status.REJECTED)),
+            last_publish=Max('user_posts__publish', filter=published),
+            comments_received=Coalesce(Sum('user_posts__active_comment_count'), 0),
+        ).values(
+            'pk',
+            'published_posts',
+            'draft_posts',
+            'rejected_posts',
+            'last_publish',
+            'comments_received',
+        )
+        rows = [
+            cls(
+                user_id=row.pop('pk'),
+                **row,
+            )
+            for row in totals.iterator(chunk_size=2000)
+        ]
+        with transaction.atomic():
+            stale = cls.objects.all()
+            if user_ids is not None:
+                stale = stale.filter(user_id__in=user_ids)
+            stale.delete()
+            cls.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    @classmethod
+    def post_saved(cls, post, previous):
+        """
+        Apply the effect of saving `post` to its author's row (and to the
+        previous author's one if it changed hands). `previous` holds the stored
+        status, author_id, publish and active_comment_count, or None for new posts.
+        """
+        if (previous
+                and previous['status'] == post.status
+                and previous['author_id'] == post.author_id
+                and as_gregorian(previous['publish']) == as_gregorian(post.publish)):
+            return
+
+        changes = {}
+        if previous:
+            old = changes.setdefault(previous['author_id'], {})
+            field = cls.STATUS_FIELDS[previous['status']]
+            old[field] = old.get(field, 0) - 1
+        new = changes.setdefault(post.author_id, {})
+        field = cls.STATUS_FIELDS[post.status]
+        new[field] = new.get(field, 0) + 1
+        if previous and previous['author_id'] != post.author_id:
+            # The post's comments follow it to the new author.
+            old['comments_received'] = -previous['active_comment_count']
+            new['comments_received'] = previous['active_comment_count']
+
+        for user_id, deltas in changes.items():
+            if not cls.objects.filter(pk=user_id).exists():
+                # A new author (or a missing row): count everything from scratch.
+                cls.rebuild([user_id])
+                continue
+            cls.objects.filter(pk=user_id).update(
+                last_publish=cls._last_publish(user_id),
+                updated=timezone.now(),
+                **{
+                    field: F(field) + delta
+                    for field, delta in deltas.items() if delta
+                },
+            )
+
+    @classmethod
+    def post_deleted(cls, post):
+        """
+        Apply the effect of deleting `post` to its author's row. The comments
+        of the post were deleted (and discounted) before it.
+        """
+        field = cls.STATUS_FIELDS[post.status]
+        # Rows are never created here: the author may be being deleted too.
+        cls.objects.filter(pk=post.author_id).update(
+            last_publish=cls._last_publish(post.author_id),
+            updated=timezone.now(),
+            **{field: F(field) - 1},
+        )
+
+    @classmethod
+    def comments_changed(cls, post_id, delta):
+        """
+        Add `delta` active comments to the author of the post with id `post_id`.
+        """
+        if delta:
+            cls.objects.filter(
+                pk=Subquery(Post.objects.filter(pk=post_id).values('author_id')),
+            ).update(comments_received=F('comments_received') + delta)
+
+
+class PostRanking(models.Model):
+    """
+    Trending score of a published post, maintained by `manage.py compute_trending`
+    (see blog/trending.py).
+
+    Scores use forward decay: an event of weight w at time t adds
+    w * exp(rate * (t - epoch)), so older scores never need to be decayed and
+    sorting by the stored value ranks posts by their decayed score.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='پست',
+    )
+
+    score = models.FloatField(
+        default=0,
+        verbose_name='امتیاز',
+    )
+
+    # Counters already included in the score.
+    views_counted = models.PositiveBigIntegerField(
+        default=0,
+    )
+
+    comments_counted = models.PositiveIntegerField(
+        default=0,
+    )
+
+    updated = jmodels.jDateTimeField(
+        auto_now=True,
+    )
+
+    class Meta:
+        """
+        Meta options for PostRanking model.
+        """
+        ordering = ['-score']
+        # The homepage reads the top rows of this index.
+        indexes = [
+            models.Index(fields=['-score']),
+        ]
+        verbose_name = 'رتبه پست'
+        verbose_name_plural = 'رتبه پست ها'
+
+    def __str__(self):
+        """
+        String representation of the PostRanking model.
+        """
+        return f"{self.post_id}: {self.score:.3g}"
+
+
+class TrendingState(models.Model):
+    """
+    Single-row model holding the decay epoch of the PostRanking scores and
+    the time of the last trending run.
+    """
+
+    # Primary key of the only row of this table.
+    SINGLETON_ID = 1
+
+    epoch = jmodels.jDateTimeField(
+        verbose_name='مبدا زمانی',
+    )
+
+    last_run = jmodels.jDateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='آخرین اجرا',
+    )
+
+    class Meta:
+        """
+        Meta options for TrendingState model.
+        """
+        verbose_name = 'وضعیت پست های داغ'
+        verbose_name_plural = 'وضعیت پست های داغ'
+
+    def __str__(self):
+        """
+        String representation of the TrendingState model.
+        """
+        return f"epoch {self.epoch}, last run {self.last_run}"
@@ -0,0 +1,161 @@
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+
+from django.db.models import Q
+
+from .models import as_gregorian
+
+
+def encode_cursor(publish, pk, direction):
+    """
+    Build an opaque cursor pointing at the row with the given (publish, id) key.
+    `direction` is 'n' for the page after that row and 'p' for the page before it.
+    """
+    payload = json.dumps(
+        [as_gregorian(publish).astimezone(timezone.utc).isoformat(), pk, direction],
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor built by encode_cursor into (publish, id, direction).
+    Returns None for missing or malformed cursors.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        publish, pk, direction = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in ('n', 'p'):
+            return None
+        return datetime.fromisoformat(publish), int(pk), direction
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def _row_key(row):
+    # (publish, id) of a model instance or of a values() dict.
+    if isinstance(row, dict):
+        return row['publish'], row['id']
+    return row.publish, row.pk
+
+
+class KeysetPage:
+    """
+    A page of a KeysetPaginator. Mirrors the parts of django.core.paginator.Page
+    that don't need a total count.
+    """
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        # Cursors are built from the first and last rows: an empty page has neither.
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return encode_cursor(*_row_key(self.object_list[-1]), 'n')
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return encode_cursor(*_row_key(self.object_list[0]), 'p')
+
+
+class KeysetPaginator:
+    """
+    Paginator walking posts in (-publish, -id) order with cursors instead of
+    OFFSET, so every page is one index range scan of `per_page + 1` rows and
+    no COUNT(*) is ever run. The queryset may yield model instances or
+    values() dicts including 'publish' and 'id'.
+    """
+
+    # Lets templates tell this paginator apart from Django's.
+    keyset = True
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def _rows(self, position):
+        # Queryset of the page `position` points to, plus one row telling
+        # whether there is another page beyond it.
+        if position is None:
+            return self.queryset.order_by('-publish', '-id')[:self.per_page + 1]
+
+        publish, pk, direction = position
+        if direction == 'n':
+            # Rows strictly after the cursor in (-publish, -id) order.
+            return self.queryset.filter(
+                Q(publish__lt=publish) | Q(publish=publish, id__lt=pk),
+            ).order_by('-publish', '-id')[:self.per_page + 1]
+
+        # Rows strictly before the cursor, read backwards (flipped in _page).
+        return self.queryset.filter(
+            Q(publish__gt=publish) | Q(publish=publish, id__gt=pk),
+        ).order_by('publish', 'id')[:self.per_page + 1]
+
+    def _page(self, position, rows):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if position is None:
+            return KeysetPage(rows, more, False)
+        if position[2] == 'n':
+            return KeysetPage(rows, more, True)
+        return KeysetPage(rows[::-1], True, more)
+
+    def page(self, cursor):
+        """
+        Return the KeysetPage the cursor points to, or the first page when the
+        cursor is missing or invalid. The page is empty when the cursor
+        points past the end (its row was deleted or unpublished).
+        """
+        position = decode_cursor(cursor)
+        return self._page(position, list(self._rows(position)))
+
+    def get_page(self, cursor):
+        """
+        Like page(), but falls back to the first page instead of an empty one.
+        """
+        page = self.page(cursor)
+        if not page.object_list and cursor:
+            page = self.page(None)
+        return page
+
+    async def apage(self, cursor):
+        """
+        Async version of page().
+        """
+        position = decode_cursor(cursor)
+        return self._page(position, [row async for row in self._rows(position)])
+
+    async def aget_page(self, cursor):
+        """
+        Async version of get_page().
+        """
+        page = await self.apage(cursor)
+        if not page.object_list and cursor:
+            page = await self.apage(None)
+        return page
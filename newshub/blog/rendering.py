@@ -0,0 +1,52 @@
+import hashlib
+import json
+
+from django.conf import settings
+
+# Need to install ( pip install markdown )
+from markdown import markdown
+
+# Markdown extensions (and their options) used for post descriptions.
+MARKDOWN_EXTENSIONS = getattr(settings, 'BLOG_MARKDOWN_EXTENSIONS', [])
+MARKDOWN_EXTENSION_CONFIGS = getattr(settings, 'BLOG_MARKDOWN_EXTENSION_CONFIGS', {})
+
+# Serialized Markdown configuration, part of every content hash so changing
+# the extensions invalidates all stored HTML.
+_CONFIG_KEY = json.dumps(
+    [MARKDOWN_EXTENSIONS, MARKDOWN_EXTENSION_CONFIGS],
+    sort_keys=True,
+    default=str,
+)
+
+
+def render_markdown(text):
+    """
+    Render Markdown text to HTML with the configured extensions.
+    """
+    return markdown(
+        text,
+        extensions=MARKDOWN_EXTENSIONS,
+        extension_configs=MARKDOWN_EXTENSION_CONFIGS,
+    )
+
+
+def markdown_hash(text):
+    """
+    Hash of the source text and the Markdown configuration it is rendered with.
+    """
+    digest = hashlib.sha256(_CONFIG_KEY.encode())
+    digest.update(b'\0')
+    digest.update(text.encode())
+    return digest.hexdigest()
+
+
+# Average reading speed used to estimate Post.reading_time, in words per minute.
+WORDS_PER_MINUTE = getattr(settings, 'BLOG_WORDS_PER_MINUTE', 200)
+
+
+def estimate_reading_time(text):
+    """
+    Estimated reading time of `text` in whole minutes (at least one).
+    """
+    words = len(text.split())
+    return max(1, -(-words // WORDS_PER_MINUTE))
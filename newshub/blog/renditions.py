@@ -0,0 +1,182 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+
+# Need to install ( pip install pillow )
+from PIL import Image as PILImage, ImageOps
+
+from .models import Image, ImageRendition
+from .routers import reading_from_primary
+
+logger = logging.getLogger(__name__)
+
+# Longest side, in pixels, of every rendition kind.
+SIZES = {
+    'thumbnail': 160,
+    'list': 320,
+    'detail': 640,
+    'detail_2x': 1280,
+    **getattr(settings, 'BLOG_RENDITION_SIZES', {}),
+}
+
+# Output formats, in order of preference; JPEG is the fallback every browser reads.
+FORMATS = getattr(settings, 'BLOG_RENDITION_FORMATS', ['avif', 'webp', 'jpeg'])
+
+# Encoder quality for the lossy formats.
+QUALITY = getattr(settings, 'BLOG_RENDITION_QUALITY', 75)
+
+# Number of background threads generating renditions in each process.
+WORKERS = getattr(settings, 'BLOG_RENDITION_WORKERS', 2)
+
+# When False, renditions are generated inline (useful for scripts and tests).
+ASYNC = getattr(settings, 'BLOG_RENDITIONS_ASYNC', True)
+
+# MIME type of every output format, used for <source type="...">.
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+
+_executor = None
+_executor_lock = Lock()
+
+
+def supported_formats():
+    """
+    Configured formats this Pillow build can encode.
+    """
+    PILImage.init()
+    return [fmt for fmt in FORMATS if fmt.upper() in PILImage.SAVE]
+
+
+def get_executor():
+    """
+    Return the process-wide worker pool, creating it on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=WORKERS,
+                thread_name_prefix='renditions',
+            )
+    return _executor
+
+
+def schedule_renditions(image_id):
+    """
+    Generate the renditions of an image once the current transaction commits,
+    in the background unless BLOG_RENDITIONS_ASYNC is off.
+    """
+    if ASYNC:
+        transaction.on_commit(lambda: get_executor().submit(_run, image_id))
+    else:
+        transaction.on_commit(lambda: _run(image_id))
+
+
+def _run(image_id):
+    # Entry point of the worker threads: they own their DB connections.
+    # Runs right after the image's commit, before a replica may have it.
+    close_old_connections()
+    try:
+        with reading_from_primary():
+            image = Image.objects.filter(pk=image_id).first()
+            if image is not None:
+                generate_renditions(image)
+    except Exception:
+        logger.exception('Generating renditions of image %s failed', image_id)
+    finally:
+        close_old_connections()
+
+
+def _encode(picture, fmt):
+    # Encode a decoded picture in `fmt` and return the bytes.
+    buffer = io.BytesIO()
+    if fmt == 'jpeg':
+        picture.convert('RGB').save(buffer, 'JPEG', quality=QUALITY, optimize=True, progressive=True)
+    else:
+        picture.save(buffer, fmt.upper(), quality=QUALITY)
+    return buffer.getvalue()
+
+
+def _redundant_kinds(longest):
+    """
+    Kinds that would only repeat another copy of a source whose longest side
+    is `longest` pixels: copies are never upscaled, so every kind at least
+    that large comes out at the source's size. Only the smallest one is kept.
+    """
+    covering = sorted((size, kind) for kind, size in SIZES.items() if size >= longest)
+    return {kind for _, kind in covering[1:]}
+
+
+def generate_renditions(image, force=False):
+    """
+    Create the missing renditions of `image` (all of them with `force`).
+    The original is decoded once and downscaled from the largest size down.
+    Returns the number of files written.
+    """
+    formats = supported_formats()
+    existing = set()
+    redundant = set()
+    for kind, fmt, width, height in image.renditions.values_list('kind', 'format', 'width', 'height'):
+        existing.add((kind, fmt))
+        if width and height and max(width, height) < SIZES.get(kind, 0):
+            # A copy smaller than its kind: the source's own size.
+            redundant = _redundant_kinds(max(width, height))
+    if redundant:
+        # Same-size copies made before the duplicates were skipped.
+        image.renditions.filter(kind__in=redundant).delete()
+    wanted = [
+        (kind, fmt)
+        for kind in SIZES
+        for fmt in formats
+        if kind not in redundant and (force or (kind, fmt) not in existing)
+    ]
+    if not wanted:
+        return 0
+
+    stem = os.path.splitext(os.path.basename(image.image_file.name))[0]
+    with image.image_file.open('rb') as source:
+        picture = PILImage.open(source)
+        # JPEGs are decoded straight at the smallest 1/2, 1/4 or 1/8 scale
+        # still covering the largest rendition, instead of at full size:
+        # an 8K upload then needs about 6 MB of pixels rather than 100 MB.
+        # The box has the picture's aspect ratio: a square one would make
+        # draft() cover the short side, decoding a 16:9 image at twice the
+        # scale needed.
+        largest = max(SIZES.values())
+        width, height = picture.size
+        longest = max(width, height)
+        picture.draft('RGB', (largest * width // longest, largest * height // longest))
+        picture = ImageOps.exif_transpose(picture)
+        if picture.mode not in ('RGB', 'RGBA'):
+            picture = picture.convert('RGBA' if 'A' in picture.getbands() else 'RGB')
+        redundant = _redundant_kinds(max(picture.size))
+
+        written = 0
+        for kind, size in sorted(SIZES.items(), key=lambda item: item[1], reverse=True):
+            # Never upscale; each step starts from the previous (larger) copy.
+            picture.thumbnail((size, size), PILImage.LANCZOS)
+            for fmt in formats:
+                if (kind, fmt) not in wanted or kind in redundant:
+                    continue
+                rendition = ImageRendition.objects.filter(image=image, kind=kind, format=fmt).first()
+                if rendition is None:
+                    rendition = ImageRendition(image=image, kind=kind, format=fmt)
+                elif rendition.file:
+                    rendition.file.storage.delete(rendition.file.name)
+                extension = 'jpg' if fmt == 'jpeg' else fmt
+                rendition.file.save(
+                    f'{stem}_{kind}.{extension}',
+                    ContentFile(_encode(picture, fmt)),
+                    save=True,
+                )
+                written += 1
+    return written
@@ -0,0 +1,248 @@
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# Aliases (in settings.DATABASES) of the read replicas of the default database.
+REPLICAS = list(getattr(settings, 'BLOG_DATABASE_REPLICAS', []))
+
+# Apps whose reads may be served by a replica. Everything else (sessions,
+# users, admin log...) stays on the primary.
+REPLICATED_APPS = set(getattr(settings, 'BLOG_REPLICATED_APPS', {'blog'}))
+
+# Seconds a visitor reads from the primary after one of their requests wrote
+# to it, so they see their own comments and edits.
+STICKY_SECONDS = getattr(settings, 'BLOG_REPLICA_STICKY_SECONDS', 15)
+STICKY_COOKIE = getattr(settings, 'BLOG_REPLICA_STICKY_COOKIE', 'blog_primary_until')
+
+# Paths always read from the primary (pages that edit what they show).
+PINNED_PATHS = tuple(getattr(settings, 'BLOG_REPLICA_PINNED_PATHS', ('/admin/',)))
+
+# Largest replication lag, in seconds, a replica may have and still be read from.
+MAX_LAG = getattr(settings, 'BLOG_REPLICA_MAX_LAG', 5)
+
+# Seconds between two lag checks of a replica, per process.
+LAG_CHECK_INTERVAL = getattr(settings, 'BLOG_REPLICA_LAG_CHECK_INTERVAL', 5)
+
+# 0 when the standby has replayed everything it received, else the age of
+# the last replayed transaction. NULL (read as 0) on a server that isn't a standby.
+LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+# Seconds after a write during which reads that fill a shared cache go to
+# the primary (see blog.cache.recently_bumped()): a replica passed its last
+# lag check, up to LAG_CHECK_INTERVAL ago, lagging up to MAX_LAG.
+FILL_FROM_PRIMARY_SECONDS = MAX_LAG + LAG_CHECK_INTERVAL
+
+# Routing state of the current request: {'unsafe': bool, 'pinned': bool, 'wrote': bool}.
+_request_state = contextvars.ContextVar('blog_routing_state', default=None)
+
+# Set inside reading_from_primary() blocks.
+_primary_reads = contextvars.ContextVar('blog_primary_reads', default=False)
+
+
+class ReplicaHealth:
+    """
+    Per-process record of which replicas are usable, refreshed by a lag query
+    at most every LAG_CHECK_INTERVAL seconds. A replica that lags more than
+    MAX_LAG seconds or fails the check is skipped until its next check.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at = {}
+        self._healthy = {}
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            due = now - self._checked_at.get(alias, float('-inf')) >= LAG_CHECK_INTERVAL
+            if due:
+                # Claimed before checking, so only one thread queries.
+                self._checked_at[alias] = now
+        if due and not _in_event_loop():
+            self._healthy[alias] = self._check(alias)
+        return self._healthy.get(alias, True)
+
+    @staticmethod
+    def _check(alias):
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                lag = cursor.fetchone()[0] or 0
+        except DatabaseError:
+            logger.warning('Replica %s is unreachable, reading from the primary.', alias, exc_info=True)
+            return False
+        if lag > MAX_LAG:
+            logger.warning('Replica %s lags %.1fs, reading from the primary.', alias, lag)
+            return False
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._checked_at.clear()
+            self._healthy.clear()
+
+
+replica_health = ReplicaHealth()
+
+
+def _in_event_loop():
+    # Queries can't run on the event loop's thread; the check waits for a sync caller.
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def is_sticky(request):
+    """
+    Whether the request comes from a visitor who wrote in the last STICKY_SECONDS.
+    """
+    try:
+        return int(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def pinned_to_primary():
+    if _primary_reads.get():
+        return True
+    state = _request_state.get()
+    return state is not None and state['pinned']
+
+
+@contextmanager
+def reading_from_primary(enabled=True):
+    """
+    Send the reads inside the block to the primary (when `enabled`). Used
+    while filling shared caches right after a write, so a lagging replica's
+    old rows aren't cached under the new generation.
+    """
+    if not enabled:
+        yield
+        return
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send the reads of REPLICATED_APPS to a healthy replica and everything else
+    to the primary (the default database).
+
+    Reads stay on the primary when the request is pinned to it (see
+    ReplicaStickiness), while they fill a shared cache shortly after a write
+    (see reading_from_primary()), inside a transaction on the primary (so
+    select_for_update() and read-modify-write code see committed data), and
+    when no replica is healthy.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related objects come from where their parent came from.
+            return instance._state.db
+        if not REPLICAS or model._meta.app_label not in REPLICATED_APPS:
+            return DEFAULT_DB_ALIAS
+        if pinned_to_primary() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        healthy = [alias for alias in REPLICAS if replica_health.is_healthy(alias)]
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Also asked before validating constraints, so this only tells the
+        # request may have written.
+        state = _request_state.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema from the primary.
+        if db in REPLICAS:
+            return False
+        return None
+
+
+class ReplicaStickiness:
+    """
+    Middleware pinning a request's reads to the primary when it isn't a
+    GET/HEAD, when it is under PINNED_PATHS, or while the visitor's sticky
+    cookie is valid. Responses to POST (and other unsafe) requests that
+    routed a write set that cookie for STICKY_SECONDS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self._state(request)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        state = self._state(request)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._finish(state, response)
+
+    @staticmethod
+    def _state(request):
+        unsafe = request.method not in ('GET', 'HEAD')
+        return {
+            'unsafe': unsafe,
+            'pinned': unsafe or request.path_info.startswith(PINNED_PATHS) or is_sticky(request),
+            'wrote': False,
+        }
+
+    @staticmethod
+    def _finish(state, response):
+        if state['unsafe'] and state['wrote']:
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(int(time.time() + STICKY_SECONDS)),
+                max_age=STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+    TrigramWordSimilarity,
+)
+from django.db.models import Exists, F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Post, Image
+
+# Hard cap on the number of results a single search can return.
+MAX_RESULTS = getattr(settings, 'BLOG_SEARCH_MAX_RESULTS', 100)
+
+# Relative weight of each matched field in the final rank.
+WEIGHTS = {
+    'title': 1.0,
+    'description': 0.6,
+    'image': 0.3,
+    **getattr(settings, 'BLOG_SEARCH_WEIGHTS', {}),
+}
+
+# Text search configuration; 'simple' doesn't stem, which suits Persian text.
+SEARCH_CONFIG = 'simple'
+
+# Must stay identical to the expression of the GIN index on Post
+# (see Post.Meta.indexes) so PostgreSQL can use it for the @@ match.
+SEARCH_DOCUMENT = SearchVector('title', 'description', config=SEARCH_CONFIG)
+
+# Weighted variant of the same document, only used to rank matched rows.
+WEIGHTED_DOCUMENT = (
+    SearchVector('title', config=SEARCH_CONFIG, weight='A')
+    + SearchVector('description', config=SEARCH_CONFIG, weight='B')
+)
+
+
+def search_queryset(query):
+    """
+    Published posts matching `query`, best match first, as a lazy queryset.
+
+    Everything runs as a single SQL statement: posts match on their own
+    title/description (trigram or full text) or through one of their images,
+    each post appears once, and the rank combines the weighted similarity of
+    the title, the description and the best matching image.
+    The `%`/`%>` trigram operators and the @@ match are served by the GIN
+    indexes created in migration 0013.
+    """
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+
+    # Images of the outer post that match the query.
+    matching_images = Image.objects.filter(
+        post=OuterRef('pk'),
+    ).filter(
+        Q(title__trigram_similar=query) | Q(description__trigram_word_similar=query),
+    )
+
+    # Similarity of the best matching image of the outer post.
+    best_image_similarity = matching_images.annotate(
+        similarity=Greatest(
+            TrigramSimilarity('title', query),
+            TrigramWordSimilarity(query, 'description'),
+        ),
+    ).order_by(
+        '-similarity',
+    ).values('similarity')[:1]
+
+    return Post.published.alias(
+        document=SEARCH_DOCUMENT,
+        title_similarity=Coalesce(
+            TrigramSimilarity('title', query),
+            Value(0.0),
+        ),
+        description_similarity=Coalesce(
+            TrigramWordSimilarity(query, 'description'),
+            Value(0.0),
+        ),
+        image_similarity=Coalesce(
+            Subquery(best_image_similarity, output_field=FloatField()),
+            Value(0.0),
+        ),
+        text_rank=SearchRank(WEIGHTED_DOCUMENT, search_query),
+    ).filter(
+        Q(title__trigram_similar=query)
+        | Q(description__trigram_word_similar=query)
+        | Q(document=search_query)
+        | Exists(matching_images)
+    ).annotate(
+        similarity=(
+            F('title_similarity') * WEIGHTS['title']
+            + F('description_similarity') * WEIGHTS['description']
+            + F('image_similarity') * WEIGHTS['image']
+            + F('text_rank')
+        ),
+    ).order_by(
+        '-similarity',
+        '-publish',
+    )
+
+
+def search_posts(query, limit=None):
+    """
+    Return up to `limit` (at most BLOG_SEARCH_MAX_RESULTS) published posts
+    matching `query`, best match first.
+    """
+    limit = min(limit or MAX_RESULTS, MAX_RESULTS)
+    return list(search_queryset(query)[:limit])
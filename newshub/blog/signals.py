@@ -0,0 +1,210 @@
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Post, Comment, Image, ImageRendition, CensoredWord, SiteStats, AuthorStats
+from . import censor
+from .cache import bump
+from .media import delete_file_on_commit
+from .renditions import schedule_renditions
+
+
+def _previous_values(sender, instance, using, *fields):
+    """
+    Fetch the stored values of `fields` for an instance that is about to be
+    saved, from the database it is saved to (never a lagging replica).
+    Returns None for new rows.
+    """
+    if instance.pk is None or instance._state.adding:
+        return None
+    return sender.objects.using(using).filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, using, **kwargs):
+    """
+    Keep the stored state of a post so post_save can compute the difference.
+    """
+    instance._previous = _previous_values(
+        sender,
+        instance,
+        using,
+        'status',
+        'author_id',
+        'publish',
+        'active_comment_count',
+    )
+
+
+@receiver(post_save, sender=Post)
+def update_stats_on_post_save(sender, instance, raw=False, **kwargs):
+    """
+    Update the site and author statistics after a post is created or edited.
+    """
+    if raw:
+        return
+    previous = getattr(instance, '_previous', None)
+    was_published = bool(previous) and previous['status'] == Post.Status.PUBLISHED
+    SiteStats.post_saved(instance, was_published)
+    AuthorStats.post_saved(instance, previous)
+
+
+@receiver(post_delete, sender=Post)
+def update_stats_on_post_delete(sender, instance, **kwargs):
+    """
+    Update the site and author statistics after a post is deleted.
+    """
+    SiteStats.post_deleted(instance)
+    AuthorStats.post_deleted(instance)
+
+
+def _add_active_comments(post_id, delta):
+    """
+    Atomically add `delta` to the active comment counters of a post and its author.
+    """
+    if delta:
+        Post.objects.filter(pk=post_id).update(
+            active_comment_count=F('active_comment_count') + delta,
+        )
+        AuthorStats.comments_changed(post_id, delta)
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_state(sender, instance, using, **kwargs):
+    """
+    Keep the stored state of a comment so post_save can compute the difference.
+    """
+    instance._previous = _previous_values(sender, instance, using, 'active', 'post_id')
+
+
+@receiver(post_save, sender=Comment)
+def update_stats_on_comment_save(sender, instance, raw=False, **kwargs):
+    """
+    Update the site and post comment counters after a comment is created,
+    (de)activated or moved.
+    """
+    if raw:
+        return
+    previous = getattr(instance, '_previous', None)
+    was_active = bool(previous) and previous['active']
+    SiteStats.comments_changed(int(instance.active) - int(was_active))
+
+    # Covers admin list_editable toggles too, as they go through save().
+    if previous and previous['post_id'] != instance.post_id:
+        # Moved to another post: it leaves the old counter and joins the new one.
+        _add_active_comments(previous['post_id'], -int(was_active))
+        _add_active_comments(instance.post_id, int(instance.active))
+    else:
+        _add_active_comments(instance.post_id, int(instance.active) - int(was_active))
+
+
+@receiver(post_delete, sender=Comment)
+def update_stats_on_comment_delete(sender, instance, **kwargs):
+    """
+    Update the site and post comment counters after a comment is deleted.
+    """
+    if instance.active:
+        SiteStats.comments_changed(-1)
+        _add_active_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Image)
+def set_cover_image_on_image_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Make a new image the cover of its post if the post has none yet.
+    """
+    if raw or not created:
+        return
+    Post.objects.filter(
+        pk=instance.post_id,
+        cover_image__isnull=True,
+    ).update(cover_image=instance)
+
+
+@receiver(post_save, sender=Image)
+def generate_renditions_on_image_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Queue the resized copies of a new image for the background workers.
+    """
+    if raw or not created:
+        return
+    schedule_renditions(instance.pk)
+
+
+@receiver(post_delete, sender=Image)
+def replace_cover_image_on_image_delete(sender, instance, **kwargs):
+    """
+    Promote the next image of the post after its cover image is deleted.
+    SET_NULL has already cleared the cover, so only posts without one are touched.
+    """
+    Post.objects.filter(
+        pk=instance.post_id,
+        cover_image__isnull=True,
+    ).update(
+        cover_image=Subquery(
+            Image.objects.filter(
+                post=OuterRef('pk'),
+            ).order_by('created', 'id').values('id')[:1]
+        ),
+    )
+
+
+# Media files are removed after the deleting transaction commits, so rows
+# deleted by Model.delete(), QuerySet.delete() or the admin's bulk action
+# all release their files, and a rollback leaves them in place.
+@receiver(post_delete, sender=Image)
+def delete_image_file(sender, instance, using, **kwargs):
+    """
+    Remove the original file of a deleted image.
+    """
+    delete_file_on_commit(instance.image_file, using=using)
+
+
+@receiver(post_delete, sender=ImageRendition)
+def delete_rendition_file(sender, instance, using, **kwargs):
+    """
+    Remove the file of a deleted image rendition.
+    """
+    delete_file_on_commit(instance.file, using=using)
+
+
+@receiver(post_save, sender=CensoredWord)
+@receiver(post_delete, sender=CensoredWord)
+def reload_censored_words(sender, **kwargs):
+    """
+    Make this process pick up word list changes right away; other processes
+    notice them within BLOG_CENSOR_CHECK_INTERVAL seconds.
+    """
+    censor.invalidate()
+
+
+# The generations are bumped after commit: bumped earlier, a reader still
+# seeing the old rows would cache them under the new generation.
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_generation(sender, **kwargs):
+    """
+    Outdate everything cached from posts, once the write is committed.
+    """
+    transaction.on_commit(lambda: bump('post'), using=kwargs.get('using'))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_generation(sender, **kwargs):
+    """
+    Outdate everything cached from comments, once the write is committed.
+    """
+    transaction.on_commit(lambda: bump('comment'), using=kwargs.get('using'))
+
+
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+@receiver(post_save, sender=ImageRendition)
+@receiver(post_delete, sender=ImageRendition)
+def bump_image_generation(sender, **kwargs):
+    """
+    Outdate everything cached from images, once the write is committed.
+    """
+    transaction.on_commit(lambda: bump('image'), using=kwargs.get('using'))
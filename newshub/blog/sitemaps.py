@@ -0,0 +1,155 @@
+import json
+import os
+import tempfile
+from datetime import timezone
+
+from django.conf import settings
+from django.db.models import BigIntegerField, Count, F, Max, Sum
+from django.urls import reverse
+
+from .models import Post, as_gregorian
+
+# Directory the sitemap files are written to, served as static files under SITEMAP_URL.
+SITEMAP_ROOT = getattr(settings, 'BLOG_SITEMAP_ROOT', os.path.join(settings.BASE_DIR, 'sitemaps'))
+SITEMAP_URL = getattr(settings, 'BLOG_SITEMAP_URL', '/sitemaps/')
+
+# Scheme and host the URLs in the sitemaps point to.
+SITE_URL = getattr(settings, 'BLOG_SITE_URL', 'http://localhost:8000').rstrip('/')
+
+# Post ids per shard; a shard never lists more URLs than the 50,000 the protocol allows.
+SHARD_SIZE = min(getattr(settings, 'BLOG_SITEMAP_SHARD_SIZE', 50_000), 50_000)
+
+# Rows read per query while writing a shard.
+CHUNK_SIZE = 5000
+
+INDEX_NAME = 'sitemap.xml'
+MANIFEST_NAME = 'manifest.json'
+
+XML_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n'
+XMLNS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def _shard_name(shard):
+    return f'sitemap-{shard}.xml'
+
+
+def _lastmod(value):
+    return as_gregorian(value).astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+
+def _write_atomic(name, chunks):
+    """
+    Write `chunks` to SITEMAP_ROOT/name through a temporary file, so the web
+    server never serves a half-written sitemap.
+    """
+    descriptor, temporary = tempfile.mkstemp(dir=SITEMAP_ROOT, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+            for chunk in chunks:
+                file.write(chunk)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, os.path.join(SITEMAP_ROOT, name))
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def shard_fingerprints():
+    """
+    {shard: (count, id sum, latest update)} of the published posts, in one
+    grouped query. Any new, removed or edited post changes its shard's value.
+    """
+    rows = Post.published.order_by().annotate(
+        shard=(F('id') - 1) / SHARD_SIZE,
+    ).values('shard').annotate(
+        count=Count('id'),
+        # PostgreSQL sums bigint columns as numeric, which Django leaves a Decimal.
+        id_sum=Sum('id', output_field=BigIntegerField()),
+        last_update=Max('update'),
+    )
+    return {
+        row['shard']: (row['count'], row['id_sum'], _lastmod(row['last_update']))
+        for row in rows
+    }
+
+
+def _shard_urls(shard):
+    """
+    Yield the <url> entries of a shard, walking its id range with keyset queries.
+    """
+    # /blog/posts/0 -> /blog/posts/ : one reverse() instead of one per post.
+    prefix = SITE_URL + reverse('blog:post_detail', args=[0])[:-1]
+    last_id = shard * SHARD_SIZE
+    end_id = last_id + SHARD_SIZE
+    while True:
+        rows = list(
+            Post.published.filter(
+                id__gt=last_id,
+                id__lte=end_id,
+            ).order_by('id').values_list('id', 'update')[:CHUNK_SIZE]
+        )
+        if not rows:
+            return
+        for post_id, update in rows:
+            yield f'<url><loc>{prefix}{post_id}</loc><lastmod>{_lastmod(update)}</lastmod></url>\n'
+        last_id = rows[-1][0]
+
+
+def _load_manifest():
+    try:
+        with open(os.path.join(SITEMAP_ROOT, MANIFEST_NAME), encoding='utf-8') as file:
+            return {int(shard): value for shard, value in json.load(file).items()}
+    except (OSError, ValueError):
+        return {}
+
+
+def build_sitemaps(force=False):
+    """
+    Bring the sitemap files in SITEMAP_ROOT up to date and return
+    (shards written, shards unchanged, shards removed).
+
+    Only shards whose fingerprint changed since the previous build (as
+    recorded in the manifest) are regenerated; the index is rewritten every
+    time so its lastmod values stay exact.
+    """
+    os.makedirs(SITEMAP_ROOT, exist_ok=True)
+    manifest = {} if force else _load_manifest()
+    fingerprints = shard_fingerprints()
+    written = unchanged = 0
+
+    for shard, fingerprint in sorted(fingerprints.items()):
+        stored = manifest.get(shard)
+        exists = os.path.exists(os.path.join(SITEMAP_ROOT, _shard_name(shard)))
+        if stored == list(fingerprint) and exists:
+            unchanged += 1
+            continue
+        _write_atomic(_shard_name(shard), [
+            XML_HEAD,
+            f'<urlset {XMLNS}>\n',
+            *_shard_urls(shard),
+            '</urlset>\n',
+        ])
+        written += 1
+
+    # Shards whose posts are all gone.
+    removed = 0
+    for shard in set(manifest) - set(fingerprints):
+        path = os.path.join(SITEMAP_ROOT, _shard_name(shard))
+        if os.path.exists(path):
+            os.unlink(path)
+        removed += 1
+
+    _write_atomic(INDEX_NAME, [
+        XML_HEAD,
+        f'<sitemapindex {XMLNS}>\n',
+        *(
+            f'<sitemap><loc>{SITE_URL}{SITEMAP_URL}{_shard_name(shard)}</loc>'
+            f'<lastmod>{fingerprint[2]}</lastmod></sitemap>\n'
+            for shard, fingerprint in sorted(fingerprints.items())
+        ),
+        '</sitemapindex>\n',
+    ])
+    _write_atomic(MANIFEST_NAME, [json.dumps({
+        str(shard): list(fingerprint) for shard, fingerprint in fingerprints.items()
+    })])
+    return written, unchanged, removed
@@ -0,0 +1,177 @@
+"""
+Slow-query log.
+
+Every query slower than THRESHOLD_MS (timed by the execute wrapper of
+blog.instrumentation) is recorded with what triggered it: the view and path
+of the request, the template being rendered, the template tag, filter or
+variable being evaluated (e.g. "blog_tags.most_active_users" or
+"comments.count"), and the project code line that ran it. The attribution
+comes from walking the Python stack, which only happens for slow queries,
+so fast ones cost nothing extra. Query parameters are left out unless
+LOG_PARAMS is set.
+
+Samples are kept in a bounded in-memory ring buffer shown to staff at
+/admin/slow-queries/, and appended as JSON lines to a rotating LOG_FILE.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import render
+from django.template import base as template_base, library as template_library
+
+# Queries slower than this many milliseconds are recorded; None turns the log off.
+THRESHOLD_MS = getattr(settings, 'BLOG_SLOW_QUERY_THRESHOLD_MS', 200)
+
+# Samples kept in memory per process.
+BUFFER_SIZE = getattr(settings, 'BLOG_SLOW_QUERY_BUFFER_SIZE', 200)
+
+# Rotating JSON-lines log of the samples, or None for the buffer only.
+LOG_FILE = getattr(settings, 'BLOG_SLOW_QUERY_LOG_FILE', None)
+LOG_MAX_BYTES = getattr(settings, 'BLOG_SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024)
+LOG_BACKUP_COUNT = getattr(settings, 'BLOG_SLOW_QUERY_LOG_BACKUP_COUNT', 5)
+
+# Record the query parameters too. They may hold personal data.
+LOG_PARAMS = getattr(settings, 'BLOG_SLOW_QUERY_LOG_PARAMS', False)
+
+# Longest SQL text kept per sample.
+MAX_SQL_LENGTH = 2000
+
+ENABLED = THRESHOLD_MS is not None
+THRESHOLD = (THRESHOLD_MS or 0) / 1000
+
+samples = deque(maxlen=BUFFER_SIZE)
+
+logger = logging.getLogger(__name__)
+_handler_lock = threading.Lock()
+_handler_ready = False
+
+# Code objects of the template engine frames the stack walk looks for.
+TEMPLATE_CODE = template_base.Template._render.__code__
+NODE_CODE = template_base.Node.render_annotated.__code__
+FILTER_CODE = template_base.FilterExpression.resolve.__code__
+VARIABLE_CODE = template_base.Variable._resolve_lookup.__code__
+TAG_CODES = {
+    template_library.SimpleNode.render.__code__,
+    template_library.InclusionNode.render.__code__,
+}
+
+# What _attribution() can find, in the order it is shown.
+ATTRIBUTION = ('template', 'tag', 'filter', 'variable', 'node', 'location')
+
+PROJECT_DIR = str(settings.BASE_DIR)
+# Frames of the query log itself are not the code that ran the query.
+OWN_FILES = {__file__, os.path.join(os.path.dirname(__file__), 'instrumentation.py')}
+
+
+def _function_name(func):
+    # "blog_tags.most_active_users" for blog.templatetags.blog_tags.most_active_users.
+    return f'{func.__module__.rsplit(".", 1)[-1]}.{func.__name__}'
+
+
+def _template_name(origin):
+    return getattr(origin, 'template_name', None) or origin.name
+
+
+def _attribution():
+    """
+    Template, node, tag, filter, variable and project code location found
+    on the current stack, innermost first.
+    """
+    found = {}
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        local = frame.f_locals
+        if code in TAG_CODES:
+            found.setdefault('tag', _function_name(local['self'].func))
+        elif code is FILTER_CODE and 'func' in local:
+            found.setdefault('filter', _function_name(local['func']))
+        elif code is VARIABLE_CODE:
+            found.setdefault('variable', local['self'].var)
+        elif code is NODE_CODE:
+            # The node's own origin: blocks of a child template render
+            # inside the _render() of the template it extends.
+            node = local['self']
+            token = getattr(node, 'token', None)
+            if token is not None:
+                found.setdefault('node', token.contents[:200])
+            if getattr(node, 'origin', None) is not None:
+                found.setdefault('template', _template_name(node.origin))
+        elif code is TEMPLATE_CODE:
+            found.setdefault('template', _template_name(local['self'].origin))
+        elif (
+            'location' not in found
+            and code.co_filename.startswith(PROJECT_DIR)
+            and code.co_filename not in OWN_FILES
+            and 'site-packages' not in code.co_filename
+        ):
+            path = os.path.relpath(code.co_filename, PROJECT_DIR)
+            found['location'] = f'{path}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    return found
+
+
+def _configure_log():
+    global _handler_ready
+    with _handler_lock:
+        if _handler_ready:
+            return
+        _handler_ready = True
+        if not LOG_FILE:
+            return
+        os.makedirs(os.path.dirname(LOG_FILE) or '.', exist_ok=True)
+        handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+
+def capture(sql, params, many, duration, context, request=None):
+    """
+    Record one slow query; called by the execute wrapper.
+    """
+    sample = {
+        'time': time.time(),
+        'duration_ms': round(duration * 1000, 1),
+        'database': context['connection'].alias,
+        'sql': sql[:MAX_SQL_LENGTH],
+        'many': many,
+        'view': None,
+        'path': None,
+        'thread': threading.current_thread().name,
+        **dict.fromkeys(ATTRIBUTION),
+        **_attribution(),
+    }
+    if LOG_PARAMS:
+        sample['params'] = repr(params)[:MAX_SQL_LENGTH]
+    if request is not None:
+        match = request.resolver_match
+        sample['view'] = match.view_name if match else None
+        sample['path'] = request.path
+    samples.append(sample)
+
+    _configure_log()
+    logger.info(json.dumps(sample, ensure_ascii=False, default=str))
+
+
+@staff_member_required
+def slow_queries_view(request):
+    """
+    The samples of this process, slowest first.
+    """
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Slow queries',
+        'threshold_ms': THRESHOLD_MS,
+        'samples': sorted(samples, key=lambda sample: sample['duration_ms'], reverse=True),
+    }
+    return render(request, 'admin/slow_queries.html', context)
@@ -1,11 +1,17 @@
 from django import template
-from django.contrib.auth.models import User
-from django.db import models
-from django.db.models import Count, Max, Min
-from ..models import Post, Comment
+from ..models import Post, SiteStats, AuthorStats, PostRanking
 
-# Need to install ( pip install markdown )
-from markdown import markdown
+# Generation-versioned cache shared by the tags below.
+from ..cache import acached_call, cached
+
+# Markdown rendering with the configured extensions.
+from ..rendering import render_markdown
+
+# Compiled matcher of the banned words.
+from ..censor import get_matcher
+
+# Formats and MIME types of the generated image renditions.
+from ..renditions import FORMATS, MIME_TYPES
 
 # To build trust for markdown
 from django.utils.safestring import mark_safe
@@ -14,48 +20,120 @@ from django.utils.safestring import mark_safe
 register = template.Library()
 
 
-@register.simple_tag
-def total_posts():
-    return Post.published.count()
+def _site_stats(context):
+    """
+    Return the SiteStats row, reusing the one the view put in the context if any.
+    """
+    stats = context.get('site_stats')
+    if stats is None:
+        stats = SiteStats.load_cached()
+    return stats
+
+
+# Async twins of the preloadable tags: tag name -> (cached tag function, coroutine function).
+ASYNC_LOADERS = {}
+
+
+def _preloadable(aloader):
+    """
+    Let the view supply a tag's result in context['preloaded_tags'], keyed by
+    (tag name, positional args). The async views load them up front with
+    apreload_tags(), as they can't query the database while rendering.
+    """
+    def decorator(func):
+        def tag(context, *args):
+            preloaded = context.get('preloaded_tags') or {}
+            key = (func.__name__, args)
+            if key in preloaded:
+                return preloaded[key]
+            return func(*args)
+        tag.__name__ = func.__name__
+        tag.__doc__ = func.__doc__
+        ASYNC_LOADERS[func.__name__] = (func, aloader)
+        return tag
+    return decorator
+
 
+async def apreload_tags(calls):
+    """
+    Results of the given (tag name, args) calls for context['preloaded_tags'],
+    read through the same cache entries as the tags themselves.
+    """
+    preloaded = {}
+    for name, args in calls:
+        func, aloader = ASYNC_LOADERS[name]
+        cache_name, depends, timeout = func.cache_args
+        preloaded[(name, args)] = await acached_call(cache_name, depends, aloader, *args, timeout=timeout)
+    return preloaded
 
-@register.simple_tag
-def total_comments():
-    return Comment.objects.filter(active=True).count()
 
+@register.simple_tag(takes_context=True)
+def total_posts(context):
+    return _site_stats(context).total_posts
 
-@register.simple_tag
-def last_post_date():
-    return Post.published.first().publish.strftime('%H:%M - %Y/%m/%d')
 
+@register.simple_tag(takes_context=True)
+def total_comments(context):
+    return _site_stats(context).total_comments
 
-@register.simple_tag
+
+@register.simple_tag(takes_context=True)
+def last_post_date(context):
+    publish = _site_stats(context).last_post_publish
+    if publish:
+        return publish.strftime('%H:%M - %Y/%m/%d')
+    return ''
+
+
+async def _amost_popular_posts(count=5):
+    return [post async for post in Post.published.order_by('-active_comment_count', '-publish')[:count]]
+
+
+@register.simple_tag(takes_context=True)
+@_preloadable(_amost_popular_posts)
+@cached('most_popular_posts', depends=('post', 'comment'))
 def most_popular_posts(count=5):
-    return Post.published.annotate(
-        comments_count=Count('comments')
-    ).order_by('-comments_count')[:count]
+    # Reads the denormalized counter through its (status, -count) index.
+    return list(Post.published.order_by('-active_comment_count', '-publish')[:count])
+
+
+async def _atrending_posts(count=5):
+    rankings = PostRanking.objects.filter(
+        post__status=Post.Status.PUBLISHED,
+    ).select_related('post').order_by('-score')[:count]
+    return [ranking.post async for ranking in rankings]
 
 
-@register.simple_tag
-def most_reading_time_post():
-    post = Post.published.order_by('-reading_time').first()
+@register.simple_tag(takes_context=True)
+@_preloadable(_atrending_posts)
+@cached('trending_posts', depends=('ranking', 'post'))
+def trending_posts(count=5):
+    # Top rows of the score index, as computed by `manage.py compute_trending`.
+    rankings = PostRanking.objects.filter(
+        post__status=Post.Status.PUBLISHED,
+    ).select_related('post').order_by('-score')[:count]
+    return [ranking.post for ranking in rankings]
+
+
+@register.simple_tag(takes_context=True)
+def most_reading_time_post(context):
+    post = _site_stats(context).most_reading_time_post
     if post:
         return {
             'name': post.title,
-            'link': post.get_absolute_url,
+            'link': post.get_absolute_url(),
         }
     return None
 
 
-@register.simple_tag
-def most_reading_time():
-    mrt = Post.published.aggregate(Max('reading_time'))
-    return mrt['reading_time__max']
+@register.simple_tag(takes_context=True)
+def most_reading_time(context):
+    return _site_stats(context).most_reading_time
 
 
-@register.simple_tag
-def least_reading_time_post():
-    post = Post.published.order_by('reading_time').first()
+@register.simple_tag(takes_context=True)
+def least_reading_time_post(context):
+    post = _site_stats(context).least_reading_time_post
     if post:
         return {
             'name': post.title,
@@ -64,41 +142,83 @@ def least_reading_time_post():
     return None
 
 
-@register.simple_tag
-def least_reading_time():
-    lrt = Post.published.aggregate(Min('reading_time'))
-    return lrt['reading_time__min']
+@register.simple_tag(takes_context=True)
+def least_reading_time(context):
+    return _site_stats(context).least_reading_time
+
 
+async def _amost_active_users(count=2):
+    authors = AuthorStats.objects.select_related('user').order_by('-published_posts')[:count]
+    return [author async for author in authors]
 
-@register.simple_tag
+
+@register.simple_tag(takes_context=True)
+@_preloadable(_amost_active_users)
+@cached('most_active_users', depends=('post',))
 def most_active_users(count=2):
-    users = User.objects.annotate(
-        num_posts=models.Count('user_posts'),
-    ).order_by('-num_posts')[:count]
-    return users
+    # Top rows of the published_posts index, with their users joined in.
+    authors = AuthorStats.objects.select_related('user').order_by('-published_posts')[:count]
+    return list(authors)
+
+
+async def _alatest_posts(count=4):
+    return {'l_posts': [post async for post in Post.published.order_by('-publish')[:count]]}
 
 
-@register.inclusion_tag("partials/latest_posts.html")
+@register.inclusion_tag("partials/latest_posts.html", takes_context=True)
+@_preloadable(_alatest_posts)
+@cached('latest_posts', depends=('post',))
 def latest_posts(count=4):
-    l_posts = Post.published.order_by('-publish')[:count]
+    l_posts = list(Post.published.order_by('-publish')[:count])
     context = {
         'l_posts': l_posts,
     }
     return context
 
 
+@register.inclusion_tag("partials/responsive_image.html")
+def responsive_image(image, sizes='300px', width=300, height=200):
+    """
+    Render a <picture> element offering every rendition of `image` via srcset.
+    Uses prefetched renditions when available and falls back to the original
+    file while the background workers haven't produced any.
+    """
+    srcsets = {}
+    for rendition in image.renditions.all():
+        # One candidate per width: a small source can leave equal-sized copies.
+        copies = srcsets.setdefault(rendition.format, [])
+        if not copies or copies[-1].width != rendition.width:
+            copies.append(rendition)
+
+    # Smallest JPEG copy at least as wide as the slot, for browsers without srcset.
+    jpegs = srcsets.pop('jpeg', [])
+    fallback = next((r for r in jpegs if r.width >= int(width)), jpegs[-1] if jpegs else None)
+
+    sources = [
+        {
+            'type': MIME_TYPES.get(fmt, f'image/{fmt}'),
+            'srcset': ', '.join(f'{r.file.url} {r.width}w' for r in srcsets[fmt]),
+        }
+        for fmt in FORMATS
+        if fmt in srcsets
+    ]
+
+    return {
+        'image': image,
+        'sources': sources,
+        'src': fallback.file.url if fallback else image.image_file.url,
+        'srcset': ', '.join(f'{r.file.url} {r.width}w' for r in jpegs),
+        'sizes': sizes,
+        'width': width,
+        'height': height,
+    }
+
+
 @register.filter(name="markdown")
 def to_markdown(text):
-    return mark_safe(markdown(text))
+    return mark_safe(render_markdown(text))
 
 
 @register.filter
 def censor_text(value):
-    censored_words = [
-        'فحش',
-        'خراب',
-        'بدکاره',
-    ]
-    for word in censored_words:
-        value = value.replace(word, "'سانسور'")
-    return value
+    return get_matcher().censor(value)
@@ -0,0 +1,139 @@
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Comment, Post, PostRanking, TrendingState, as_gregorian
+
+# Seconds after which an event counts half as much.
+HALF_LIFE = getattr(settings, 'BLOG_TRENDING_HALF_LIFE', 24 * 3600)
+
+# Weight of publishing a post, of one view and of one active comment.
+WEIGHTS = {
+    'publish': 10.0,
+    'view': 1.0,
+    'comment': 5.0,
+    **getattr(settings, 'BLOG_TRENDING_WEIGHTS', {}),
+}
+
+# Growth exponent at which the epoch is moved forward, long before
+# exp() can overflow a float (e ** 100 is about 1e43).
+MAX_EXPONENT = 100
+
+RATE = math.log(2) / HALF_LIFE
+
+
+def _exponent(moment, epoch):
+    return RATE * (as_gregorian(moment) - as_gregorian(epoch)).total_seconds()
+
+
+def _rebase(state, now):
+    """
+    Move the epoch to `now` once scores grow too large, scaling every stored
+    score down by the same factor so their order is unchanged.
+    Returns True if it did.
+    """
+    exponent = _exponent(now, state.epoch)
+    if exponent <= MAX_EXPONENT:
+        return False
+    PostRanking.objects.update(score=F('score') * math.exp(-exponent))
+    state.epoch = now
+    return True
+
+
+def _active_post_ids(since):
+    """
+    Ids of the posts viewed, commented on or edited after `since`.
+    """
+    ids = set(Post.objects.filter(last_viewed__gt=since).values_list('id', flat=True))
+    ids.update(Comment.objects.filter(updated__gt=since).values_list('post_id', flat=True))
+    ids.update(Post.objects.filter(update__gt=since).values_list('id', flat=True))
+    return ids
+
+
+def _batches(ids, size):
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def compute_trending(full=False, batch_size=1000):
+    """
+    Update the PostRanking rows of the posts with activity since the last run
+    (all published posts on the first run or with `full`).
+
+    A post entering the ranking starts from its publish weight plus its
+    current views and comments, all as of its publish time; afterwards the new
+    views and comments counted since the previous run are added as of now.
+    Returns a dict of counts.
+    """
+    now = timezone.now()
+    result = {'ranked': 0, 'added': 0, 'removed': 0, 'rebased': False}
+
+    with transaction.atomic():
+        state = TrendingState.objects.select_for_update().filter(pk=TrendingState.SINGLETON_ID).first()
+        if state is None or full:
+            PostRanking.objects.all().delete()
+            state, _ = TrendingState.objects.update_or_create(
+                pk=TrendingState.SINGLETON_ID,
+                defaults={'epoch': now, 'last_run': None},
+            )
+        result['rebased'] = _rebase(state, now)
+
+        if state.last_run is None:
+            candidates = set(Post.published.values_list('id', flat=True))
+        else:
+            candidates = _active_post_ids(state.last_run)
+            # Posts unpublished (or deleted) since the last run leave the ranking.
+            result['removed'], _ = PostRanking.objects.filter(
+                post_id__in=candidates,
+            ).exclude(post__status=Post.Status.PUBLISHED).delete()
+
+        growth_now = math.exp(_exponent(now, state.epoch))
+        for ids in _batches(candidates, batch_size):
+            posts = Post.published.filter(pk__in=ids).values(
+                'id',
+                'publish',
+                'views',
+                'active_comment_count',
+            )
+            rankings = PostRanking.objects.in_bulk(ids)
+            added, changed = [], []
+            for post in posts:
+                ranking = rankings.get(post['id'])
+                if ranking is None:
+                    ranking = PostRanking(
+                        post_id=post['id'],
+                        score=math.exp(_exponent(post['publish'], state.epoch)) * (
+                            WEIGHTS['publish']
+                            + WEIGHTS['view'] * post['views']
+                            + WEIGHTS['comment'] * post['active_comment_count']
+                        ),
+                    )
+                    added.append(ranking)
+                else:
+                    gained = (
+                        WEIGHTS['view'] * (post['views'] - ranking.views_counted)
+                        + WEIGHTS['comment'] * (post['active_comment_count'] - ranking.comments_counted)
+                    )
+                    # Deactivated comments can take points away, never below zero.
+                    ranking.score = max(ranking.score + gained * growth_now, 0)
+                    changed.append(ranking)
+                ranking.views_counted = post['views']
+                ranking.comments_counted = post['active_comment_count']
+                ranking.updated = now
+
+            PostRanking.objects.bulk_create(added)
+            PostRanking.objects.bulk_update(
+                changed,
+                ['score', 'views_counted', 'comments_counted', 'updated'],
+            )
+            result['added'] += len(added)
+            result['ranked'] += len(added) + len(changed)
+
+        # Activity during this run is picked up by the next one.
+        state.last_run = now
+        state.save()
+    return result
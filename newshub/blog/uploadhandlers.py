@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+# Largest accepted size, in bytes, of a single uploaded file.
+MAX_UPLOAD_BYTES = getattr(settings, 'BLOG_UPLOAD_MAX_BYTES', 20 * 1024 * 1024)
+
+
+class BoundedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Upload handler that streams every file straight to a temporary file on disk
+    in `chunk_size` pieces (64 KiB by default) and gives up on a file as soon as
+    it grows past BLOG_UPLOAD_MAX_BYTES, so an upload never holds more than one
+    chunk in memory and oversized files are never stored. Such files are
+    marked `oversized` for the form to reject.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > MAX_UPLOAD_BYTES:
+            # Drop what was written and ignore the rest, but still hand the
+            # (empty) file to the form so it can say the file is too large
+            # rather than missing.
+            if not self.oversized:
+                self.oversized = True
+                self.file.seek(0)
+                self.file.truncate()
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.oversized = self.oversized
+        return file
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, async_views, feeds, api
 
 app_name = 'blog'
 
@@ -15,4 +15,17 @@ urlpatterns = [
     path('profile/edit_post/<int:post_id>/', views.edit_post, name='edit_post'),
     path('profile/delete_post/<int:post_id>/', views.delete_post, name='delete_post'),
     path('profile/delete_image/<int:post_id>/<int:image_id>/', views.delete_image, name='delete_image'),
+    # Feeds, as rss, atom or json.
+    path('feeds/<str:feed_format>/', feeds.post_feed, name='post_feed'),
+    path('feeds/author/<str:username>/<str:feed_format>/', feeds.author_feed, name='author_feed'),
+    path('feeds/search/<str:feed_format>/', feeds.search_feed, name='search_feed'),
+    # Read-only JSON API.
+    path('api/posts/', api.post_list, name='api_post_list'),
+    path('api/posts/<int:id>/', api.post_detail, name='api_post_detail'),
+    path('api/posts/<int:id>/images/', api.post_images, name='api_post_images'),
+    # Async versions of the read views, for ASGI servers.
+    path('async/', async_views.index, name='async_index'),
+    path('async/posts/', async_views.post_list, name='async_post_list'),
+    path('async/posts/<int:id>', async_views.post_detail, name='async_post_detail'),
+    path('async/search/', async_views.post_search, name='async_post_search'),
 ]
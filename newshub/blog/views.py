@@ -3,22 +3,43 @@ from django.http import HttpResponse, Http404
 from .models import *
 from .forms import *
 from django.views.generic import ListView, DetailView
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, condition
+from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import login_required
-from django.contrib.postgres.search import TrigramSimilarity
+from django.core.paginator import Paginator
+from django.conf import settings
+from django.utils.http import urlencode
+from .search import search_posts
+from .pagination import KeysetPaginator
+from .counters import counts_views
+from .conditional import post_detail_etag, post_list_etag
+
+# Number of search results shown per page.
+SEARCH_RESULTS_PER_PAGE = getattr(settings, 'BLOG_SEARCH_RESULTS_PER_PAGE', 10)
 
 
 # View to render the index page.
 def index(request):
+    # All homepage numbers come from the single statistics row.
+    context = {
+        'site_stats': SiteStats.load_cached(),
+    }
+
     return render(
         request,
         "blog/index.html",
+        context,
     )
 
 
+# Unchanged pages are answered with 304 before anything is rendered.
+@method_decorator(
+    condition(etag_func=post_list_etag),
+    name='dispatch',
+)
 class PostListView(ListView):
-    # Returns all published posts.
-    queryset = Post.published.all()
+    # Returns all published posts, with their cover image joined in.
+    queryset = Post.published.with_cover()
 
     # Defines the context variable name for the list of posts.
     context_object_name = "posts"
@@ -27,13 +48,28 @@ class PostListView(ListView):
     paginate_by = 3
     template_name = "blog/list.html"
 
+    # 'offset' uses Django's paginator, 'keyset' walks the list with cursors.
+    pagination_mode = getattr(settings, 'BLOG_POST_LIST_PAGINATION', 'offset')
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.pagination_mode != 'keyset':
+            return super().paginate_queryset(queryset, page_size)
+
+        # Keyset pagination: no COUNT(*) and no OFFSET, whatever the page.
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.get_page(self.request.GET.get('cursor'))
+        return paginator, page, page.object_list, page.has_other_pages()
+
 
+# Views are buffered in memory and written in batches, 304s included.
+@counts_views
+@condition(etag_func=post_detail_etag)
 def post_detail(request, id):
     # Retrieve the post by id, raising a 404 error if not found or not published.
+    # Author and images are loaded up front so the template runs no extra queries.
     post = get_object_or_404(
-        Post,
+        Post.published.with_images().select_related('author'),
         id=id,
-        status=Post.Status.PUBLISHED,
     )
 
     # Filter and retrieve active comments related to the post.
@@ -167,6 +203,7 @@ def create_post(request):
 def post_search(request):
     query = None
     results = []
+    page_obj = None
 
     if 'query' in request.GET:
         # Initialize the search form with GET data.
@@ -178,72 +215,27 @@ def post_search(request):
             # Get the cleaned search query.
             query = form.cleaned_data['query']
 
-            # Search for posts with similar titles
-            results1 = Post.published.annotate(
-                similarity=TrigramSimilarity('title', query),
-            ).filter(
-                similarity__gt=0.1,
-            ).order_by(
-                '-similarity',
-            )
+            # One ranked, de-duplicated and capped result list from a single query.
+            results = search_posts(query)
 
-            # Search for posts with similar descriptions.
-            results2 = Post.published.annotate(
-                similarity=TrigramSimilarity('description', query),
-            ).filter(
-                similarity__gt=0.1,
-            ).order_by(
-                '-similarity',
-            )
+            # Paginate the capped result list without another COUNT query.
+            paginator = Paginator(results, SEARCH_RESULTS_PER_PAGE)
+            page_obj = paginator.get_page(request.GET.get('page'))
+            results = page_obj.object_list
 
-            # Search for images with similar titles.
-            image_results1 = Image.objects.annotate(
-                similarity=TrigramSimilarity('title', query),
-            ).filter(
-                similarity__gt=0.1,
-            ).order_by(
-                '-similarity',
-            )
-
-            # Search for images with similar descriptions.
-            image_results2 = Image.objects.annotate(
-                similarity=TrigramSimilarity('description', query),
-            ).filter(
-                similarity__gt=0.1,
-            ).order_by(
-                '-similarity',
-            )
-
-            # Get the related posts for images matching the search query.
-            post_results_from_image1 = [img.post for img in image_results1]
-            post_results_from_image2 = [img.post for img in image_results2]
-
-            # Combine all search results into one list.
-            combined_results = (
-                    list(results1)
-                    + list(results2)
-                    + post_results_from_image1
-                    + post_results_from_image2
-            )
-
-            # Sort and remove duplicates from the combined results based on similarity.
-            results = sorted(
-                set(combined_results),
-                key=lambda x: x.similarity if hasattr(x, 'similarity') else 0,
-                reverse=True,
-            )
-
-        context = {
-            'query': query,
-            'results': results,
-        }
+    context = {
+        'query': query,
+        'results': results,
+        'page_obj': page_obj,
+        'pagination_query': urlencode({'query': query}) if query else '',
+    }
 
-        # Render the search results page.
-        return render(
-            request,
-            'blog/search.html',
-            context,
-        )
+    # Render the search results page.
+    return render(
+        request,
+        'blog/search.html',
+        context,
+    )
 
 
 @login_required(login_url='/admin/login/')
@@ -253,6 +245,8 @@ def profile(request):
 
     context = {
         'posts': posts,
+        # Post and comment totals of the user, None before their first post.
+        'author_stats': AuthorStats.objects.filter(user=user).first(),
     }
 
     return render(
@@ -279,7 +273,7 @@ def delete_post(request, post_id):
 
 @login_required(login_url='/admin/login/')
 def edit_post(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.with_images(), id=post_id)
 
     if request.method == 'POST':
         form = CreatePostForm(request.POST, request.FILES, instance=post)
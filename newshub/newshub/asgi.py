@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
+
+The async versions of the public read views are served under /blog/async/
+(see blog/async_views.py); `manage.py benchmark_async` compares them with
+the sync ones.
 """
 
 import os
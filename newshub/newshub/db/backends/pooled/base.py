@@ -0,0 +1,106 @@
+"""
+PostgreSQL backend borrowing its connections from a per-process pool.
+
+Django opens a connection when a request first queries and closes it when
+the request ends (CONN_MAX_AGE = 0). With this backend "opening" checks a
+connection out of the pool and "closing" gives it back, so requests skip
+the TCP, TLS and authentication round trips of a fresh connection. The
+pool is configured by the POOL entry of the database settings:
+
+    'ENGINE': 'newshub.db.backends.pooled',
+    'POOL': {
+        'MIN_SIZE': 2,      # opened on first use
+        'MAX_SIZE': 10,     # per process; keep workers * MAX_SIZE under max_connections
+        'TIMEOUT': 10,      # seconds a checkout waits when all are in use
+        'MAX_AGE': 1800,    # seconds before a connection is replaced
+        'CHECK': True,      # run SELECT 1 before handing a connection out
+    },
+
+A connection that broke while idle (server restart, idle timeout, killed
+backend) fails its check and is replaced before anyone gets it. Without
+CHECK each such connection fails the query of one request first; Django
+then finds it unusable at the end of the request and the pool drops it.
+A connection that breaks while in use, or that is returned in an aborted
+transaction it can't roll back, is closed instead of being reused.
+"""
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from django.db.backends.postgresql.creation import DatabaseCreation as PostgresDatabaseCreation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from django.db.backends.base.base import NO_DB_ALIAS
+
+from .pool import ConnectionPool, close_pool, get_pool
+
+POOL_DEFAULTS = {
+    'MIN_SIZE': 0,
+    'MAX_SIZE': 10,
+    'TIMEOUT': 10,
+    'MAX_AGE': 1800,
+    'CHECK': True,
+}
+
+
+def _pool_key(conn_params):
+    # Hashable identity of the database and credentials a pool connects with.
+    return tuple(sorted((name, repr(value)) for name, value in conn_params.items()))
+
+
+class DatabaseCreation(PostgresDatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Closing the wrapper only returns its connection to the pool: the
+        # idle pooled sessions would make DROP DATABASE fail.
+        close_pool(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    # Pool the current connection came from; the pool for the alias may
+    # have been replaced since (see get_pool()).
+    _connection_pool = None
+
+    @property
+    def pool(self):
+        return self._pool_for(self.get_connection_params())
+
+    def _pool_for(self, conn_params):
+        return get_pool(self.alias, _pool_key(conn_params), lambda: self._create_pool(conn_params))
+
+    def _create_pool(self, conn_params):
+        options = {**POOL_DEFAULTS, **self.settings_dict.get('POOL', {})}
+        # The pool outlives this (thread-local) wrapper: it opens connections
+        # through a wrapper of its own, the way the plain backend does.
+        opener = PostgresDatabaseWrapper(self.settings_dict, self.alias)
+        return ConnectionPool(
+            lambda: opener.get_new_connection(conn_params),
+            min_size=options['MIN_SIZE'],
+            max_size=options['MAX_SIZE'],
+            timeout=options['TIMEOUT'],
+            max_age=options['MAX_AGE'],
+            check=options['CHECK'],
+        )
+
+    def get_new_connection(self, conn_params):
+        if self.alias == NO_DB_ALIAS:
+            # Short-lived maintenance connections (creating and dropping the
+            # test database) are not pooled: they'd hold on to the server.
+            return super().get_new_connection(conn_params)
+        self._connection_pool = self._pool_for(conn_params)
+        connection = self._connection_pool.getconn()
+        # Set by the parent on connect; pooled connections keep the configured level.
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            IsolationLevel.READ_COMMITTED if isolation_level is None else IsolationLevel(isolation_level)
+        )
+        return connection
+
+    def _close(self):
+        pool, self._connection_pool = self._connection_pool, None
+        if self.connection is not None and pool is None:
+            super()._close()
+        elif self.connection is not None:
+            # Closed mid-transaction, Django keeps referring to the
+            # connection until the atomic block exits: it can't be shared.
+            with self.wrap_database_errors:
+                pool.putconn(self.connection, discard=self.in_atomic_block)
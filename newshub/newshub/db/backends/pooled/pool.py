@@ -0,0 +1,315 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from psycopg2 import OperationalError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INERROR, TRANSACTION_STATUS_INTRANS
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(OperationalError):
+    """
+    No connection became available within the pool's checkout timeout.
+    """
+
+
+class _Waiter:
+    """
+    A getconn() call queued for a connection, or for room to open one.
+    """
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.connection = None
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections for one database alias.
+
+    getconn() hands out the most recently returned idle connection (so the
+    others can age out), opening a new one while fewer than `max_size` are
+    open, and otherwise waits up to `timeout` seconds for one to come back.
+    Waiters are served in arrival order: a returned connection (or the room
+    left by a closed one) goes straight to the longest waiting call, so
+    busy threads can't keep taking it back ahead of them.
+    Connections older than `max_age` seconds are closed instead of reused;
+    with `check`, a cheap query proves a connection alive before it is
+    handed out. putconn() rolls back whatever the borrower left open.
+    """
+
+    def __init__(self, connect, min_size=0, max_size=10, timeout=10, max_age=1800, check=True):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.timeout = timeout
+        self.max_age = max_age
+        self.check = check
+        self._lock = threading.Lock()
+        # Idle connections; only kept while nobody waits.
+        self._idle = deque()
+        self._waiters = deque()
+        # Creation time of every open connection, by id().
+        self._created = {}
+        self._in_use = 0
+        # Connections being opened, counted against max_size.
+        self._opening = 0
+        self._filled = False
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'timeouts': 0,
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'failed_checks': 0,
+            'max_in_use': 0,
+        }
+
+    def getconn(self):
+        """
+        Return a usable connection, raising PoolTimeout if none is free in time.
+        """
+        if not self._filled:
+            self._fill()
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        while True:
+            waiter = None
+            with self._lock:
+                if self._idle:
+                    connection = self._idle.pop()
+                elif len(self._created) + self._opening < self.max_size:
+                    connection = None
+                    self._opening += 1
+                else:
+                    waiter = _Waiter()
+                    self._waiters.append(waiter)
+            if waiter is not None:
+                waited = True
+                # None: room was made for this call to open a connection.
+                connection = self._wait(waiter, deadline)
+
+            if connection is None:
+                # Opened outside the lock: connecting takes a network round trip or more.
+                try:
+                    connection = self._connect()
+                except BaseException:
+                    with self._lock:
+                        self._opening -= 1
+                        self._make_room()
+                    raise
+                with self._lock:
+                    self._opening -= 1
+                    self._created[id(connection)] = time.monotonic()
+                    self._stats['connections_opened'] += 1
+            elif not self._usable(connection):
+                self._discard(connection)
+                continue
+
+            with self._lock:
+                waited_for = time.monotonic() - started
+                self._in_use += 1
+                self._stats['checkouts'] += 1
+                self._stats['max_in_use'] = max(self._stats['max_in_use'], self._in_use)
+                if waited:
+                    self._stats['waits'] += 1
+                    self._stats['wait_seconds'] += waited_for
+                    self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited_for)
+            return connection
+
+    def _wait(self, waiter, deadline):
+        # Block until putconn() or _make_room() serves `waiter`.
+        waiter.ready.wait(max(deadline - time.monotonic(), 0))
+        with self._lock:
+            if waiter.ready.is_set():
+                return waiter.connection
+            self._waiters.remove(waiter)
+            self._stats['timeouts'] += 1
+        raise PoolTimeout(
+            f'No database connection available after {self.timeout}s '
+            f'({self.max_size} in use).'
+        )
+
+    def _make_room(self):
+        # Called with the lock held after connections closed or failed to
+        # open: the first waiters may open new ones in their place.
+        while self._waiters and len(self._created) + self._opening < self.max_size:
+            self._opening += 1
+            self._waiters.popleft().ready.set()
+
+    def _make_idle(self, connection):
+        # Called with the lock held: hand the connection to the first waiter, or keep it idle.
+        if self._waiters:
+            waiter = self._waiters.popleft()
+            waiter.connection = connection
+            waiter.ready.set()
+        else:
+            self._idle.append(connection)
+
+    def putconn(self, connection, discard=False):
+        """
+        Give a connection back, closing it when `discard` is set, when it is
+        broken or too old, or when its transaction can't be rolled back.
+        """
+        with self._lock:
+            self._in_use -= 1
+        if not discard and not connection.closed:
+            status = connection.info.transaction_status
+            if status in (TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_INERROR):
+                try:
+                    connection.rollback()
+                    status = connection.info.transaction_status
+                except Exception:
+                    status = None
+            discard = status != TRANSACTION_STATUS_IDLE or self._expired(connection)
+        if discard or connection.closed:
+            self._discard(connection)
+            return
+        with self._lock:
+            self._make_idle(connection)
+
+    def _fill(self):
+        # Open min_size connections up front, on first use.
+        with self._lock:
+            if self._filled:
+                return
+            self._filled = True
+            missing = self.min_size - len(self._created) - self._opening
+            self._opening += max(missing, 0)
+        for opened in range(max(missing, 0)):
+            try:
+                connection = self._connect()
+            except Exception:
+                # getconn() reports the error; the rest open on demand.
+                logger.warning('Filling the database connection pool failed', exc_info=True)
+                with self._lock:
+                    self._opening -= missing - opened
+                    self._make_room()
+                return
+            with self._lock:
+                self._opening -= 1
+                self._created[id(connection)] = time.monotonic()
+                self._stats['connections_opened'] += 1
+                if self._waiters:
+                    self._make_idle(connection)
+                else:
+                    self._idle.appendleft(connection)
+
+    def _expired(self, connection):
+        created = self._created.get(id(connection))
+        return self.max_age is not None and created is not None and time.monotonic() - created > self.max_age
+
+    def _usable(self, connection):
+        if connection.closed or self._expired(connection):
+            return False
+        if not self.check:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                # Outside autocommit the check opened a transaction.
+                connection.rollback()
+            return True
+        except Exception:
+            with self._lock:
+                self._stats['failed_checks'] += 1
+            return False
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created.pop(id(connection), None)
+            self._stats['connections_closed'] += 1
+            self._make_room()
+
+    def close(self):
+        """
+        Close the idle connections; those in use are closed when returned.
+        """
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+            self.max_age = 0
+        for connection in idle:
+            self._discard(connection)
+
+    def metrics(self):
+        """
+        Snapshot of the pool's size, saturation and checkout statistics.
+        """
+        with self._lock:
+            size = len(self._created)
+            return {
+                'size': size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'saturation': self._in_use / self.max_size,
+                **self._stats,
+            }
+
+
+# Pools of this process: alias -> (connection key, pool). Forked workers start with their own.
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+# Pools inherited from a parent process. Kept referenced and never closed:
+# closing them would end the parent's sessions over the shared sockets.
+_inherited = []
+
+
+def get_pool(alias, key, create):
+    """
+    This process's pool for `alias`, made by calling `create()` on first use.
+    `key` identifies the database the pool connects to (its connection
+    parameters): when it changes, e.g. the test runner switching NAME to the
+    test database, the old pool is closed and a new one made.
+    """
+    global _pools_pid
+    stale = None
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _inherited.extend(pool for _, pool in _pools.values())
+            _pools.clear()
+            _pools_pid = os.getpid()
+        current = _pools.get(alias)
+        if current is not None and current[0] == key:
+            return current[1]
+        if current is not None:
+            stale = current[1]
+        pool = create()
+        _pools[alias] = (key, pool)
+    if stale is not None:
+        stale.close()
+    return pool
+
+
+def close_pool(alias):
+    """
+    Close this process's pool for `alias`, disconnecting its idle sessions;
+    connections in use are closed when they are returned.
+    """
+    with _pools_lock:
+        current = _pools.pop(alias, None) if _pools_pid == os.getpid() else None
+    if current is not None:
+        current[1].close()
+
+
+def pool_metrics():
+    """
+    {alias: metrics} of this process's pools.
+    """
+    with _pools_lock:
+        pools = {alias: pool for alias, (_, pool) in _pools.items()} if _pools_pid == os.getpid() else {}
+    return {alias: pool.metrics() for alias, pool in pools.items()}
@@ -43,20 +43,24 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.instrumentation.RequestInstrumentation',
     'django.middleware.security.SecurityMiddleware',
+    'blog.routers.ReplicaStickiness',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'blog.middleware.AnonymousPageCache',
 ]
 
 ROOT_URLCONF = 'newshub.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates timing each render for blog.instrumentation.
+        'BACKEND': 'blog.instrumentation.InstrumentedTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -94,6 +98,28 @@ DATABASES = {
     }
 }
 
+# Pooled connections (newshub/db/backends/pooled): borrow connections from a
+# per-process pool instead of opening one per request. Not enabled by
+# default yet; compare the two with `manage.py benchmark_connections` first.
+#
+# DATABASES['default'].update({
+#     'ENGINE': 'newshub.db.backends.pooled',
+#     'POOL': {
+#         # Connections opened on first use, and the most a process keeps;
+#         # keep workers * MAX_SIZE below the server's max_connections.
+#         'MIN_SIZE': 2,
+#         'MAX_SIZE': 10,
+#         # Seconds a request waits for a free connection before failing.
+#         'TIMEOUT': 10,
+#         # Seconds after which a connection is closed and replaced.
+#         'MAX_AGE': 1800,
+#         # Run SELECT 1 before handing out a connection, so connections
+#         # left dead by a server restart are replaced instead of failing
+#         # a request each.
+#         'CHECK': True,
+#     },
+# })
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -146,3 +172,185 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # DJANGORESIZED_DEFAULT_FORCE_FORMAT = 'JPEG'
 # DJANGORESIZED_DEFAULT_FORMAT_EXTENSIONS = {'JPEG': ".jpg"}
 # DJANGORESIZED_DEFAULT_NORMALIZE_ROTATION = False
+
+# Blog search (blog/search.py)
+# Hard cap on the number of results a search returns.
+BLOG_SEARCH_MAX_RESULTS = 100
+# Number of search results shown per page.
+BLOG_SEARCH_RESULTS_PER_PAGE = 10
+# Relative weight of each matched field in the search rank.
+BLOG_SEARCH_WEIGHTS = {
+    'title': 1.0,
+    'description': 0.6,
+    'image': 0.3,
+}
+
+# Post list pagination: 'offset' (numbered pages) or 'keyset' (cursor based,
+# constant cost per page, no total count).
+BLOG_POST_LIST_PAGINATION = 'offset'
+
+# Markdown rendering of post descriptions (blog/rendering.py).
+# Changing these invalidates the stored HTML; run `manage.py render_descriptions`.
+BLOG_MARKDOWN_EXTENSIONS = []
+BLOG_MARKDOWN_EXTENSION_CONFIGS = {}
+
+# Image renditions (blog/renditions.py)
+# Uploads are stored untouched; resized copies are generated in the background.
+# Longest side, in pixels, of every rendition kind.
+BLOG_RENDITION_SIZES = {
+    'thumbnail': 160,
+    'list': 320,
+    'detail': 640,
+    'detail_2x': 1280,
+}
+# Output formats in order of preference (formats Pillow can't encode are skipped).
+BLOG_RENDITION_FORMATS = ['avif', 'webp', 'jpeg']
+BLOG_RENDITION_QUALITY = 75
+# Background threads per process generating renditions.
+BLOG_RENDITION_WORKERS = 2
+BLOG_RENDITIONS_ASYNC = True
+
+# Uploads (blog/uploadhandlers.py, blog/forms.py)
+# Every uploaded file is streamed to a temporary file in 64 KiB chunks, so an
+# upload holds at most one chunk in memory while it is received. Images are
+# then validated from their header only (format, dimensions, pixel count), and
+# the background rendition workers decode JPEGs with draft mode at the smallest
+# scale that still covers the largest rendition. Peak memory per upload is
+# therefore ~64 KiB in the request and about 3 bytes per decoded pixel in the
+# worker (≈ 6 MB for a 7680x4320 JPEG).
+FILE_UPLOAD_HANDLERS = [
+    'blog.uploadhandlers.BoundedTemporaryFileUploadHandler',
+]
+# Largest accepted upload, in bytes.
+BLOG_UPLOAD_MAX_BYTES = 20 * 1024 * 1024
+# Largest accepted image, in pixels and per side.
+BLOG_UPLOAD_MAX_PIXELS = 40_000_000
+BLOG_UPLOAD_MAX_DIMENSION = 10_000
+BLOG_UPLOAD_IMAGE_FORMATS = ['JPEG', 'PNG', 'WEBP', 'GIF']
+
+# Media file deletion (blog/media.py)
+# Files of deleted images are removed after commit, in one batch per
+# transaction, on the background worker pool when this is True.
+BLOG_MEDIA_DELETE_ASYNC = True
+
+# Censoring (blog/censor.py)
+# Words censored by the censor_text filter in addition to the CensoredWord table.
+BLOG_CENSORED_WORDS = [
+    'فحش',
+    'خراب',
+    'بدکاره',
+]
+BLOG_CENSOR_REPLACEMENT = "'سانسور'"
+# Seconds between checks of the CensoredWord table for changes, per process.
+BLOG_CENSOR_CHECK_INTERVAL = 30
+
+# Caching
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# The blog caches (generations, fragments, pages, feeds) must live in a
+# backend shared by every worker process: with a per-process LocMemCache a
+# write would only outdate the copies of the process that made it. The
+# 'blog' file cache is shared by the processes of one host; use memcached
+# or redis when serving from several hosts.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'blog': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, '.cache', 'blog'),
+    },
+}
+
+# Generation-versioned fragment cache (blog/cache.py)
+BLOG_CACHE_ALIAS = 'blog'
+# Seconds a cached value is fresh, then kept stale while it's recomputed.
+BLOG_CACHE_TIMEOUT = 300
+BLOG_CACHE_STALE_TIMEOUT = 3600
+BLOG_CACHE_LOCK_TIMEOUT = 30
+
+# Anonymous page cache (blog/middleware.py)
+# Seconds a cached page is fresh, then served stale while one request
+# renders it again, or in place of a failed render.
+BLOG_PAGE_CACHE_TIMEOUT = 60
+BLOG_PAGE_CACHE_STALE_WHILE_REVALIDATE = 300
+BLOG_PAGE_CACHE_STALE_IF_ERROR = 3600
+
+# Post view counter (blog/counters.py)
+# Views are buffered per process and flushed every BLOG_VIEW_COUNTER_FLUSH_INTERVAL
+# seconds, or as soon as BLOG_VIEW_COUNTER_MAX_PENDING views are waiting.
+BLOG_VIEW_COUNTER_FLUSH_INTERVAL = 10
+BLOG_VIEW_COUNTER_MAX_PENDING = 5000
+
+# Trending ranking (blog/trending.py), updated by `manage.py compute_trending`.
+# Seconds after which a view or comment counts half as much.
+BLOG_TRENDING_HALF_LIFE = 24 * 3600
+BLOG_TRENDING_WEIGHTS = {
+    'publish': 10.0,
+    'view': 1.0,
+    'comment': 5.0,
+}
+
+# Feeds (blog/feeds.py)
+BLOG_FEED_TITLE = 'News Hub'
+BLOG_FEED_ITEMS = 50
+# Seconds clients may reuse a feed before revalidating it.
+BLOG_FEED_MAX_AGE = 300
+
+# Sitemaps (blog/sitemaps.py), written by `manage.py build_sitemaps`.
+BLOG_SITE_URL = 'http://localhost:8000'
+BLOG_SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+BLOG_SITEMAP_URL = '/sitemaps/'
+BLOG_SITEMAP_SHARD_SIZE = 50_000
+
+# JSON API (blog/api.py)
+BLOG_API_PAGE_SIZE = 20
+BLOG_API_MAX_PAGE_SIZE = 100
+# Seconds clients may reuse an API response before revalidating it.
+BLOG_API_MAX_AGE = 60
+
+# Read replicas (blog/routers.py)
+# Reads of the blog app go to a healthy replica listed here, writes and
+# everything else to 'default'. Example with one replica:
+#
+# DATABASES['replica'] = {
+#     **DATABASES['default'],
+#     'HOST': 'replica.example.internal',
+#     # Tests read the test database through it instead of creating another.
+#     'TEST': {'MIRROR': 'default'},
+# }
+# BLOG_DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['blog.routers.PrimaryReplicaRouter']
+BLOG_DATABASE_REPLICAS = []
+# Seconds a visitor reads from the primary after writing.
+BLOG_REPLICA_STICKY_SECONDS = 15
+# Replicas lagging more than this many seconds are skipped; lag is checked
+# at most every BLOG_REPLICA_LAG_CHECK_INTERVAL seconds per process.
+BLOG_REPLICA_MAX_LAG = 5
+BLOG_REPLICA_LAG_CHECK_INTERVAL = 5
+
+# Request instrumentation (blog/instrumentation.py)
+# Query count, SQL, render and total time of every request, sent in a
+# Server-Timing header and served to Prometheus at /metrics.
+BLOG_SERVER_TIMING = True
+# Who may read /metrics besides staff users: scrapers sending
+# "Authorization: Bearer <BLOG_METRICS_TOKEN>", and clients in
+# BLOG_METRICS_ALLOWED_IPS. Behind a reverse proxy every request comes from
+# the proxy's address: list it in BLOG_METRICS_TRUSTED_PROXIES so the
+# client is read from X-Forwarded-For, or an allowed 127.0.0.1 would let
+# the whole internet in through a local proxy.
+BLOG_METRICS_TOKEN = os.environ.get('BLOG_METRICS_TOKEN')
+BLOG_METRICS_ALLOWED_IPS = []
+BLOG_METRICS_TRUSTED_PROXIES = []
+
+# Slow-query log (blog/slow_queries.py)
+# Queries slower than this many milliseconds are recorded with the view,
+# template and template tag that ran them; None turns the log off. Staff
+# see the latest samples at /admin/slow-queries/.
+BLOG_SLOW_QUERY_THRESHOLD_MS = 200
+BLOG_SLOW_QUERY_BUFFER_SIZE = 200
+# Rotating JSON-lines copy of the samples.
+BLOG_SLOW_QUERY_LOG_FILE = os.path.join(BASE_DIR, 'logs', 'slow_queries.log')
+BLOG_SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+BLOG_SLOW_QUERY_LOG_BACKUP_COUNT = 5
+# Also record query parameters; they can contain personal data.
+BLOG_SLOW_QUERY_LOG_PARAMS = False
@@ -18,13 +18,26 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
+from blog.instrumentation import metrics_view
+from blog.slow_queries import slow_queries_view
 
 urlpatterns = [
+    # Before the admin, whose catch-all would answer it with a 404.
+    path('admin/slow-queries/', slow_queries_view, name='slow_queries'),
     path('admin/', admin.site.urls),
-    path('blog/', include('blog.urls', namespace='blog'))
+    path('blog/', include('blog.urls', namespace='blog')),
+    # Prometheus metrics of the serving process.
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 urlpatterns += static(
     settings.MEDIA_URL,
     document_root=settings.MEDIA_ROOT,
 )
+
+# Written by `manage.py build_sitemaps`; in production let the web server
+# serve BLOG_SITEMAP_ROOT under BLOG_SITEMAP_URL.
+urlpatterns += static(
+    settings.BLOG_SITEMAP_URL,
+    document_root=settings.BLOG_SITEMAP_ROOT,
+)